@@ -4,14 +4,17 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.websockets import WebSocketState
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Union, Any
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Dict, List, Optional, Union, Any
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.hash import argon2
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import UpdateOne, InsertOne, IndexModel, ReturnDocument, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import BulkWriteError
+from bson import json_util
 from pydantic import GetCoreSchemaHandler
 from pydantic_core import core_schema
 from fastapi.openapi.docs import get_swagger_ui_html
@@ -20,10 +23,29 @@ import json
 import secrets
 from fastapi import Body
 from fastapi import UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+import orjson
+import functools
+try:
+    import msgpack  # optional: enables the binary WebSocket subprotocol
+except ImportError:
+    msgpack = None
+from starlette.background import BackgroundTask
 import pandas as pd
+import numpy as np
+import openpyxl
 import random
 import io
+import time
+import copy
+import fcntl
+import base64
+import csv
+from uuid import uuid4
+import shutil
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -166,6 +188,11 @@ class Message(MessageBase):
         populate_by_name=True
     )
 
+class ReadReceipt(BaseModel):
+    peerId: Optional[str] = None
+    groupId: Optional[str] = None
+    upTo: str
+
 class GroupBase(BaseModel):
     name: str
     description: str
@@ -239,6 +266,98 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return argon2.hash(password)
 
+# Password worker pool
+# argon2 is CPU-heavy and memory-hard; running it inline stalls the event loop and
+# every open WebSocket with it. Hashing runs on an executor instead. argon2-cffi
+# releases the GIL, so threads already spread across cores; "process" is
+# available for deployments that want full isolation.
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_EXECUTOR", "thread")  # thread | process
+# Each argon2 hash holds memory_cost=65536 KiB (64 MiB) while it runs, so the pool
+# size bounds peak memory: 4 workers is ~256 MiB, already half a 512 MB instance.
+# Count the CPUs this process may actually run on (containers pin fewer than
+# cpu_count() reports) and cap it; raise PASSWORD_WORKERS only with memory to spare.
+_AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 2)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(_AVAILABLE_CPUS, 4))))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "256"))
+
+class PasswordWorkerPool:
+    def __init__(self, kind: str = PASSWORD_EXECUTOR, workers: int = PASSWORD_WORKERS, queue_max: int = PASSWORD_QUEUE_MAX):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown PASSWORD_EXECUTOR {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_max = queue_max
+        self._executor = None
+        self.pending = 0     # submitted but not finished (running + queued)
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self):
+        # Created lazily so importing the module doesn't fork worker processes
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_max:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "in_flight": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_ms": (self.total_seconds / self.completed * 1000) if self.completed else 0.0,
+        }
+
+password_pool = PasswordWorkerPool()
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_pool.run(get_password_hash, password)
+
+def _hash_many(passwords):
+    return [get_password_hash(p) for p in passwords]
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """Hash a batch of passwords, split into one slice per worker so the batch uses every core"""
+    if not passwords:
+        return []
+    size = -(-len(passwords) // password_pool.workers)
+    slices = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    results = await asyncio.gather(*(password_pool.run(_hash_many, part) for part in slices))
+    return [hashed for part in results for hashed in part]
+
 def create_access_token(user: dict, expires_delta: timedelta):
     to_encode = {
         "name": user["name"],
@@ -250,6 +369,80 @@ def create_access_token(user: dict, expires_delta: timedelta):
     to_encode["exp"] = int(expire.timestamp())
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# Serializers
+# Shared document -> response shapes, so write paths can answer from the document
+# they just inserted instead of reading it back.
+IST = pytz.timezone("Asia/Kolkata")
+
+def get_message_time():
+    """get_current_time() truncated to the millisecond precision MongoDB stores."""
+    now = get_current_time()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+# Opaque (timestamp, _id) position used for paging and as the up-to point of read receipts
+def encode_cursor(timestamp: datetime, document_id) -> str:
+    raw = json.dumps([timestamp.isoformat(), str(document_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, document_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), ObjectId(document_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Serialization
+# HTTP responses and WebSocket frames share one orjson encoder. orjson writes
+# datetimes natively (naive ones in the same ISO form jsonable_encoder used), so
+# ObjectId is the only type that needs a hook and documents from Motor can be
+# encoded as they are instead of being copied field by field into strings.
+# Handlers that return documents containing ObjectIds must return a
+# FastJSONResponse themselves, because FastAPI runs jsonable_encoder on plain
+# return values before the response class sees them.
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_json(content) -> bytes:
+    return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+class Frame(str):
+    """JSON text of a WebSocket frame that keeps the dict it was encoded from,
+    so binary connections can pack the dict instead of re-parsing the text."""
+
+    def __new__(cls, text: str, data: dict):
+        frame = super().__new__(cls, text)
+        frame.data = data
+        frame.packed = None
+        return frame
+
+def encode_frame(frame: dict) -> str:
+    return Frame(dumps_json(frame).decode(), frame)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+def serialize_message(message: dict) -> dict:
+    return {**message, "cursor": encode_cursor(message["timestamp"], message["_id"])}
+
+def serialize_ws_message(message: dict, **extra) -> dict:
+    """Message payload for WebSocket frames: a cursor and an IST-aware timestamp (ISO with offset in JSON)."""
+    return {
+        **message,
+        "cursor": encode_cursor(message["timestamp"], message["_id"]),
+        "timestamp": message["timestamp"].astimezone(IST),
+        **extra,
+    }
+
+def serialize_user(user: dict) -> dict:
+    user = dict(user)
+    user["_id"] = str(user["_id"])
+    user.pop("password", None)
+    return user
+
 from fastapi import Request, Header, HTTPException, status
 
 async def verify_csrf(
@@ -266,6 +459,186 @@ async def verify_csrf(
 
 
 
+# In-flight lookup coalescing shared by the request caches below
+async def _single_flight(pending: dict, key, loader):
+    """Run loader() once per key; concurrent callers for the same key await the same result."""
+    future = pending.get(key)
+    if future:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    pending[key] = future
+    try:
+        result = await loader()
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        # Nobody may be waiting on the future; retrieve it so asyncio doesn't warn
+        future.exception()
+        raise
+    finally:
+        del pending[key]
+
+# Tenant registry
+# Every request resolves collegeId -> database through SaaS_Management.colleges.
+# The set of colleges is small and changes rarely, so keep it in process with a
+# TTL and invalidate explicitly (on every worker) from the college lifecycle endpoints.
+TENANT_CACHE_TTL_SECONDS = float(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+
+class TenantRegistry:
+    def __init__(self, ttl: float = TENANT_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: dict = {}   # collegeId -> (expires_at, record)
+        self._pending: dict = {}   # collegeId -> Future for an in-flight lookup
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, college_id: str):
+        """Return {collegeId, collegeName, databaseName, status, db} or None if unknown."""
+        entry = self._entries.get(college_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return await _single_flight(self._pending, college_id, lambda: self._load(college_id))
+
+    async def _load(self, college_id: str):
+        college = await client["SaaS_Management"].colleges.find_one(
+            {"collegeId": college_id},
+            {"collegeId": 1, "collegeName": 1, "databaseName": 1, "status": 1}
+        )
+        if not college:
+            return None
+        record = {
+            "collegeId": college["collegeId"],
+            "collegeName": college.get("collegeName"),
+            "databaseName": college["databaseName"],
+            "status": college.get("status"),
+            "db": client[college["databaseName"]],
+        }
+        self._entries[college_id] = (time.monotonic() + self.ttl, record)
+        return record
+
+    def invalidate(self, college_id: Optional[str] = None):
+        """Drop one college (or every college when college_id is None) from the cache."""
+        self.invalidations += 1
+        if college_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(college_id, None)
+
+    async def evict(self, college_id: str):
+        """Invalidate a college on this worker and every other worker."""
+        self.invalidate(college_id)
+        await message_bus.publish({"kind": "tenant", "college": college_id})
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+tenant_registry = TenantRegistry()
+
+# Principal cache
+# Dashboard pages fire several authenticated calls at once and each one used to
+# re-read the user document. Cache a slim projection per (collegeId, role, email)
+# with a TTL and LRU bound; profile writes invalidate their entry on every worker.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+# Large or sensitive fields that authorization never needs
+PRINCIPAL_PROJECTION = {"password": 0, "professionalExperience": 0, "achievements": 0, "Experience": 0}
+
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # (collegeId, role, email) -> (expires_at, user)
+        self._pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, college_id: str, role: str, email: str, college_db):
+        """Return a copy of the cached user (without password) or None if the user doesn't exist."""
+        key = (college_id, role, email)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+        self.misses += 1
+        user = await _single_flight(self._pending, key, lambda: self._load(key, college_db))
+        return dict(user) if user is not None else None
+
+    async def _load(self, key, college_db):
+        user = await college_db[key[1]].find_one({"email": key[2]}, PRINCIPAL_PROJECTION)
+        if user is None:
+            return None
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, college_id: str, role: str, email: str):
+        self.invalidations += 1
+        self._entries.pop((college_id, role, email), None)
+
+    def invalidate_ids(self, college_id: str, role: str, user_ids: List[ObjectId]):
+        """Drop entries by document id, for writes that only know ids (bulk deletes)."""
+        ids = set(user_ids)
+        stale = [
+            key for key, (_, user) in self._entries.items()
+            if key[0] == college_id and key[1] == role and user["_id"] in ids
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    async def evict(self, college_id: str, role: str, email: str):
+        """Invalidate on this worker and every other worker."""
+        self.invalidate(college_id, role, email)
+        await message_bus.publish({"kind": "principal", "college": college_id, "role": role, "email": email})
+
+    async def evict_ids(self, college_id: str, role: str, user_ids: List[ObjectId]):
+        self.invalidate_ids(college_id, role, user_ids)
+        await message_bus.publish({
+            "kind": "principal",
+            "college": college_id,
+            "role": role,
+            "ids": [str(user_id) for user_id in user_ids],
+        })
+
+    def handle_event(self, event: dict):
+        """Apply an invalidation published by another worker."""
+        if "ids" in event:
+            self.invalidate_ids(event["college"], event["role"], [ObjectId(user_id) for user_id in event["ids"]])
+        else:
+            self.invalidate(event["college"], event["role"], event["email"])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+principal_cache = PrincipalCache()
+
 async def get_token_from_cookie(request: Request) -> str:
     token = request.cookies.get("access_token")
     if not token:
@@ -290,23 +663,28 @@ async def get_current_user(token: str = Depends(get_token_from_cookie)):
         
         raise credentials_exception
 
-    # Fetch the college's database name from the global SaaS_Management database
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    # Resolve the college's database through the tenant registry
+    college = await tenant_registry.get(college_id)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
-    # Connect to the college's database
-    college_db = client[college["databaseName"]]
-    user = await college_db[payload.get("role")].find_one({"email": token_data["email"]})
+    college_db = college["db"]
+    role = payload.get("role")
+    if role not in ("Student", "Alumni", "Admin"):
+        raise credentials_exception
+    user = await principal_cache.get(college_id, role, token_data["email"], college_db)
     if user is None:
         raise credentials_exception
     user["collegeDb"] = college_db  # Attach the database to the user object for later use
-    del user["password"]
+    rollup_recorder.record_active(college_db, user["_id"])
     return user
 
 # FastAPI App
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+
+@app.on_event("shutdown")
+async def shutdown_password_pool():
+    password_pool.shutdown()
 
 def custom_openapi():
     if app.openapi_schema:
@@ -344,6 +722,9 @@ def custom_openapi():
         ("/groups/{group_id}/members", "post"),
         ("/achievements/", "post"),
         ("/students/","get"),
+        ("/system/metrics", "get"),
+        ("/jobs/{job_id}", "get"),
+        ("/jobs/{job_id}/result", "get"),
     }
     for path, methods in openapi_schema["paths"].items():
         for method in methods:
@@ -363,68 +744,1450 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 
 
+# Group membership cache
+# Group fan-out needs the member ids of a group for every message. Keep them as
+# sets per (collegeId, groupId), filled on first use, kept current by the group
+# write endpoints and evicted least-recently-used.
+GROUP_CACHE_MAX_GROUPS = int(os.getenv("GROUP_CACHE_MAX_GROUPS", "5000"))
+
+class GroupMembershipCache:
+    def __init__(self, max_groups: int = GROUP_CACHE_MAX_GROUPS):
+        self.max_groups = max_groups
+        self._groups: OrderedDict = OrderedDict()  # (collegeId, groupId) -> set of member id strings
+        self._pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def members(self, college_id: str, group_id: str, college_db) -> Optional[set]:
+        """Member ids of the group as strings, or None if the group doesn't exist."""
+        key = (college_id, group_id)
+        members = self._groups.get(key)
+        if members is not None:
+            self._groups.move_to_end(key)
+            self.hits += 1
+            return members
+        self.misses += 1
+        return await _single_flight(self._pending, key, lambda: self._load(key, college_db))
+
+    async def _load(self, key, college_db):
+        group = await college_db.groups.find_one({"_id": ObjectId(key[1])}, {"members": 1})
+        if not group:
+            return None
+        members = {str(member) for member in group.get("members", [])}
+        self._store(key, members)
+        return members
+
+    def _store(self, key, members: set):
+        self._groups[key] = members
+        self._groups.move_to_end(key)
+        while len(self._groups) > self.max_groups:
+            self._groups.popitem(last=False)
+
+    def set_members(self, college_id: str, group_id: str, member_ids):
+        self._store((college_id, group_id), {str(member) for member in member_ids})
+
+    def add_member(self, college_id: str, group_id: str, member_id: str):
+        # Only update groups we already hold; others load fresh on next use
+        members = self._groups.get((college_id, group_id))
+        if members is not None:
+            members.add(str(member_id))
+
+    def invalidate(self, college_id: str, group_id: str):
+        self._groups.pop((college_id, group_id), None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "groups": len(self._groups),
+            "max_groups": self.max_groups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+group_members_cache = GroupMembershipCache()
+
+def message_frame_id(frame: str) -> Optional[str]:
+    """_id of the chat message carried by a frame, if it carries one."""
+    payload = frame.data if isinstance(frame, Frame) else orjson.loads(frame)
+    if payload.get("type") in ("message", "group_message"):
+        return str(payload["data"]["_id"])
+    return None
+
+class ResumeState:
+    """Per-connection bookkeeping for a resume that is in progress."""
+    __slots__ = ("held", "delivered")
+
+    def __init__(self):
+        self.held: Optional[list] = None  # live frames waiting for the current page
+        self.delivered: set = set()       # message ids already sent live during this resume
+
+    def remember(self, frame: str):
+        message_id = message_frame_id(frame)
+        if message_id is not None:
+            self.delivered.add(message_id)
+
+# Binary framing
+# Clients that offer the MSGPACK_SUBPROTOCOL subprotocol (and only when msgpack
+# is installed) get MessagePack binary frames with ObjectIds as their 12 raw
+# bytes and timestamps as epoch milliseconds; they may send msgpack frames too.
+# Everyone else gets JSON text frames, which the server compresses with
+# permessage-deflate whenever the client negotiates it. Frames are built once as
+# JSON and transcoded per encoding, so fan-out packs each frame only once.
+MSGPACK_SUBPROTOCOL = "alumniconnect.msgpack.v1"
+FRAME_ID_FIELDS = frozenset({"_id", "senderId", "receiverId", "groupId", "userId", "readerId", "peerId",
+                             "conversationId", "createdBy", "members", "admins"})
+FRAME_TIME_FIELDS = frozenset({"timestamp", "lastSeen", "readAt", "createdAt", "lastMessageAt"})
+
+def _compact_value(value, key=None):
+    if isinstance(value, dict):
+        return {k: _compact_value(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact_value(v, key) for v in value]
+    if isinstance(value, str):
+        if key in FRAME_ID_FIELDS and ObjectId.is_valid(value):
+            return ObjectId(value).binary
+        if key in FRAME_TIME_FIELDS:
+            try:
+                moment = datetime.fromisoformat(value)
+            except ValueError:
+                return value
+            if moment.tzinfo is None:
+                moment = IST.localize(moment)
+            return int(moment.timestamp() * 1000)
+    return value
+
+def _expand_value(value, key=None):
+    if isinstance(value, dict):
+        return {k: _expand_value(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_expand_value(v, key) for v in value]
+    if isinstance(value, bytes) and key in FRAME_ID_FIELDS and len(value) == 12:
+        return str(ObjectId(value))
+    return value
+
+def _msgpack_default(value):
+    if isinstance(value, ObjectId):
+        return value.binary
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = IST.localize(value)
+        return int(value.timestamp() * 1000)
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+def pack_frame(frame: str) -> bytes:
+    """MessagePack form of a frame, packed once per frame because one frame goes to many sockets."""
+    if not isinstance(frame, Frame):
+        return _pack_json_frame(frame)
+    if frame.packed is None:
+        # Ids and times are ObjectId/datetime in the dict, so only the default hook converts
+        frame.packed = msgpack.packb(frame.data, default=_msgpack_default)
+    return frame.packed
+
+@functools.lru_cache(maxsize=256)
+def _pack_json_frame(frame: str) -> bytes:
+    # Frames relayed from other workers arrive as JSON text only
+    return msgpack.packb(_compact_value(orjson.loads(frame)))
+
+def unpack_frame(data: bytes) -> dict:
+    return _expand_value(msgpack.unpackb(data))
+
+def choose_subprotocol(websocket: WebSocket) -> Optional[str]:
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+async def receive_frame(websocket: WebSocket) -> dict:
+    """Next inbound frame as a dict, whichever framing the client used."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if message.get("bytes") is not None:
+        if msgpack is None:
+            raise ValueError("Binary frames are not supported")
+        return unpack_frame(message["bytes"])
+    return orjson.loads(message["text"])
+
+# Outbound WebSocket queues
+# Senders never await a recipient's socket. Each connection has a bounded queue
+# drained by its own writer task; when a slow client lets the queue fill up the
+# policy either drops the oldest queued frame or disconnects the client.
+WS_SEND_QUEUE_MAX = int(os.getenv("WS_SEND_QUEUE_MAX", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest | disconnect
+
+class ClientConnection:
+    __slots__ = ("websocket", "user_id", "college_id", "policy", "queue", "closed", "dropped", "last_active", "heartbeats", "resume", "binary", "_writer")
+
+    def __init__(self, websocket: WebSocket, user_id: str, college_id: str, binary: bool = False,
+                 queue_max: int = WS_SEND_QUEUE_MAX, policy: str = WS_SLOW_CONSUMER_POLICY):
+        self.websocket = websocket
+        self.binary = binary
+        self.user_id = user_id
+        self.college_id = college_id
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max)
+        self.closed = False
+        self.dropped = 0
+        self.last_active = time.monotonic()
+        self.heartbeats = False
+        self.resume: Optional[ResumeState] = None
+        self._writer = asyncio.create_task(self._drain())
+
+    def send(self, message: str, replay: bool = False) -> bool:
+        """Queue a frame without waiting. Returns False if the frame was not queued.
+
+        While a resume is in progress live frames are held back (or, between
+        pages, remembered) so replayed history and live traffic never overlap.
+        """
+        if self.closed:
+            return False
+        resume = self.resume
+        if resume is not None and not replay:
+            if resume.held is not None:
+                resume.held.append(message)
+                if len(resume.held) > self.queue.maxsize:
+                    # Too much live traffic to keep holding; deliver it and skip it in later pages
+                    self.release_held()
+                return True
+            resume.remember(message)
+        return self._put(message)
+
+    def release_held(self, replayed: frozenset = frozenset()):
+        """Deliver frames held during a resume page, minus the messages the page already replayed."""
+        resume = self.resume
+        held, resume.held = resume.held or [], None
+        for message in held:
+            if message_frame_id(message) not in replayed:
+                resume.remember(message)
+                self._put(message)
+
+    def _put(self, message: str) -> bool:
+        if self.queue.full():
+            if self.policy == "disconnect":
+                print(f"Disconnecting slow consumer {self.college_id}:{self.user_id}")
+                self.close(code=1013, reason="Client too slow")
+                return False
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+        return True
+
+    async def _drain(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                if self.binary:
+                    await self.websocket.send_bytes(pack_frame(message))
+                else:
+                    await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error sending to {self.college_id}:{self.user_id}: {e}")
+            self.closed = True
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        """Stop the writer; with a code, also close the socket."""
+        if self.closed and code is None:
+            return
+        self.closed = True
+        self._writer.cancel()
+        if code is not None and self.websocket.client_state == WebSocketState.CONNECTED:
+            asyncio.create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+# Message bus
+# ConnectionManager only knows the sockets of its own process. Every delivery is
+# also published on the bus so the other workers of this host can deliver to
+# the sockets they hold. LocalBus (single worker) publishes nowhere;
+# UnixSocketBus relays events through a broker on a Unix socket that is hosted
+# by whichever worker holds the broker lock, and taken over if that worker dies.
+BUS_BACKEND = os.getenv("BUS_BACKEND", "local")  # local | unix
+BUS_SOCKET_PATH = os.getenv("BUS_SOCKET_PATH", "/tmp/alumniconnect-bus.sock")
+BUS_MAX_BUFFER_BYTES = int(os.getenv("BUS_MAX_BUFFER_BYTES", str(8 * 1024 * 1024)))
+# Longest event line the bus will read; longer lines are logged and skipped
+BUS_LINE_LIMIT = int(os.getenv("BUS_LINE_LIMIT", str(4 * 1024 * 1024)))
+
+class LocalBus:
+    def __init__(self):
+        self._handler = None
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.oversized = 0
+
+    def subscribe(self, handler):
+        """handler(event) is awaited for every event published by another process."""
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def publish(self, event: dict):
+        pass
+
+    async def _dispatch(self, event: dict):
+        self.received += 1
+        if self._handler is not None:
+            try:
+                await self._handler(event)
+            except Exception as e:
+                print(f"Error handling bus event {event.get('kind')}: {e}")
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "local",
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "oversized": self.oversized,
+        }
+
+class UnixSocketBus(LocalBus):
+    def __init__(self, path: str = BUS_SOCKET_PATH):
+        super().__init__()
+        self.path = path
+        self._lock_file = None
+        self._server = None
+        self._peers: set = set()        # broker side: writers of connected workers
+        self._writer = None             # worker side: connection to the broker
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def _try_become_broker(self) -> bool:
+        # The flock is released by the OS when the holder exits, so a new broker can take over
+        lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _run(self):
+        delay = 0.1
+        while True:
+            try:
+                if self._server is None and self._try_become_broker():
+                    self._server = await asyncio.start_unix_server(self._serve_peer, self.path, limit=BUS_LINE_LIMIT)
+                    print(f"Message bus broker listening on {self.path}")
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=BUS_LINE_LIMIT)
+                self._writer = writer
+                delay = 0.1
+                while line := await self._read_line(reader):
+                    await self._dispatch(orjson.loads(line))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Message bus connection error: {e}")
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    async def _read_line(self, reader) -> bytes:
+        """Return the next event line, or b"" at EOF. Lines over BUS_LINE_LIMIT are skipped."""
+        while True:
+            try:
+                return await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError:
+                return b""
+            except asyncio.LimitOverrunError:
+                # Dropping one oversized event is better than dropping the connection
+                # and every event queued behind it
+                self.oversized += 1
+                print(f"Skipping message bus event larger than {BUS_LINE_LIMIT} bytes")
+                if not await self._skip_line(reader):
+                    return b""
+
+    @staticmethod
+    async def _skip_line(reader) -> bool:
+        """Discard input up to and including the next newline; False at EOF."""
+        while True:
+            try:
+                await reader.readuntil(b"\n")
+                return True
+            except asyncio.IncompleteReadError:
+                return False
+            except asyncio.LimitOverrunError as e:
+                await reader.readexactly(e.consumed)
+
+    async def _serve_peer(self, reader, writer):
+        self._peers.add(writer)
+        try:
+            while line := await self._read_line(reader):
+                for peer in list(self._peers):
+                    if peer is writer:
+                        continue
+                    if peer.transport.get_write_buffer_size() > BUS_MAX_BUFFER_BYTES:
+                        # A stuck worker must not grow the broker without bound
+                        print("Dropping unresponsive message bus peer")
+                        self._peers.discard(peer)
+                        peer.close()
+                        continue
+                    peer.write(line)
+        except Exception as e:
+            print(f"Message bus peer error: {e}")
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def publish(self, event: dict):
+        writer = self._writer
+        if writer is None or writer.transport.get_write_buffer_size() > BUS_MAX_BUFFER_BYTES:
+            self.dropped += 1
+            return
+        writer.write(dumps_json(event) + b"\n")
+        self.published += 1
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "unix",
+            "role": "broker" if self._server is not None else "worker",
+            "connected": self._writer is not None,
+            "peers": len(self._peers),
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "oversized": self.oversized,
+        }
+
+def create_message_bus(backend: str = BUS_BACKEND):
+    if backend == "local":
+        return LocalBus()
+    if backend == "unix":
+        return UnixSocketBus()
+    raise ValueError(f"Unknown BUS_BACKEND {backend!r}")
+
+message_bus = create_message_bus()
+
 # WebSocket Manager
+# Connections are indexed collegeId -> userId -> set of ClientConnection, so a
+# user can hold several sockets (tabs, devices), tenant-wide sends touch only
+# that tenant's connections, and each socket is removed exactly on disconnect.
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.tenants: Dict[str, Dict[str, set]] = {}
+        self.connection_count = 0
+        self.dropped_frames = 0
 
-    async def connect(self, websocket: WebSocket, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
+    async def connect(self, websocket: WebSocket, user_id: str, college_id: str) -> Optional[ClientConnection]:
+        subprotocol = choose_subprotocol(websocket)
         try:
             if websocket.client_state == WebSocketState.CONNECTING:  # Ensure WebSocket is still connecting
-                await websocket.accept()
-            self.active_connections[key] = websocket
+                await websocket.accept(subprotocol=subprotocol)
         except Exception as e:
             print(f"WebSocket connection error: {e}")
-        
-
-    def disconnect(self, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
-        if key in self.active_connections:
-            del self.active_connections[key]
+            return None
+        connection = ClientConnection(websocket, user_id, college_id, binary=subprotocol is not None)
+        self.tenants.setdefault(college_id, {}).setdefault(user_id, set()).add(connection)
+        self.connection_count += 1
+        return connection
+
+    def disconnect(self, connection: Optional[ClientConnection]) -> bool:
+        """Remove one socket. Returns True when it was the user's last socket."""
+        if connection is None:
+            return False
+        connection.close()
+        users = self.tenants.get(connection.college_id)
+        sockets = users.get(connection.user_id) if users else None
+        if sockets is None or connection not in sockets:
+            return False
+        sockets.discard(connection)
+        self.dropped_frames += connection.dropped
+        self.connection_count -= 1
+        if sockets:
+            return False
+        del users[connection.user_id]
+        if not users:
+            del self.tenants[connection.college_id]
+        return True
+
+    def is_online(self, college_id: str, user_id: str) -> bool:
+        return user_id in self.tenants.get(college_id, {})
+
+    def online_users(self, college_id: str):
+        return self.tenants.get(college_id, {}).keys()
+
+    def _enqueue(self, message: str, user_id: str, college_id: str) -> bool:
+        sockets = self.tenants.get(college_id, {}).get(user_id)
+        if not sockets:
+            return False
+        delivered = False
+        for connection in list(sockets):
+            delivered = connection.send(message) or delivered
+        return delivered
 
     async def send_personal_message(self, message: str, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
-        if key in self.active_connections:
-            await self.active_connections[key].send_text(message)
+        self._enqueue(message, user_id, college_id)
+        await message_bus.publish({"kind": "user", "college": college_id, "user": user_id, "message": message})
+
+    async def _send_to_users(self, message: str, user_ids, college_id: str):
+        for user_id in user_ids:
+            self._enqueue(message, user_id, college_id)
+
+    async def send_to_users(self, message: str, user_ids: set, college_id: str):
+        online = self.online_users(college_id)
+        await self._send_to_users(message, user_ids & online, college_id)
+        await message_bus.publish({"kind": "users", "college": college_id, "users": list(user_ids), "message": message})
 
     async def broadcast_to_group(self, message: str, group_id: str, college_id: str, college_db, exclude_user_id: str = None):
+        await self._deliver_group(message, group_id, college_id, college_db, exclude_user_id)
+        await message_bus.publish({
+            "kind": "group",
+            "college": college_id,
+            "group": group_id,
+            "exclude": exclude_user_id,
+            "message": message,
+        })
+
+    async def handle_bus_event(self, event: dict):
+        """Deliver an event published by another worker to this worker's sockets."""
+        kind = event["kind"]
+        college_id = event["college"]
+        if kind == "user":
+            self._enqueue(event["message"], event["user"], college_id)
+        elif kind == "users":
+            await self._send_to_users(event["message"], set(event["users"]) & self.online_users(college_id), college_id)
+        elif kind == "group":
+            if not self.tenants.get(college_id):
+                return
+            college = await tenant_registry.get(college_id)
+            if college:
+                await self._deliver_group(event["message"], event["group"], college_id, college["db"], event["exclude"])
+        elif kind == "group_members":
+            group_members_cache.invalidate(college_id, event["group"])
+        elif kind == "recommend":
+            skill_recommender.handle_event(event)
+        elif kind == "principal":
+            principal_cache.handle_event(event)
+        elif kind == "tenant":
+            tenant_registry.invalidate(college_id)
+
+    async def _deliver_group(self, message: str, group_id: str, college_id: str, college_db, exclude_user_id: str = None):
+        online = self.online_users(college_id)
         if not group_id:
             # If no group_id is provided, broadcast to all users in the college
-            for key in self.active_connections:
-                if key.startswith(f"{college_id}:") and not key.endswith(f":{exclude_user_id}"):
-                    try:
-                        await self.active_connections[key].send_text(message)
-                    except Exception as e:
-                        print(f"Error broadcasting to {key}: {e}")
+            await self._send_to_users(message, [u for u in online if u != exclude_user_id], college_id)
             return
-            
-        group = await college_db.groups.find_one({"_id": ObjectId(group_id)})
-        if not group:
+
+        members = await group_members_cache.members(college_id, group_id, college_db)
+        if members is None:
             print(f"Group {group_id} not found")
             return
-    
-        members = group["members"]
-        print(f"Broadcasting to group {group_id} with members {members}")
-        for member_id in members:
-            member_id_str = str(member_id)
-            if member_id_str == exclude_user_id:
-                continue  # Skip the sender
-            key = f"{college_id}:{member_id_str}"
-            if key in self.active_connections:
+
+        # Set intersection walks the smaller side, so cost follows online members
+        recipients = members & online
+        recipients.discard(exclude_user_id)
+        await self._send_to_users(message, recipients, college_id)
+
+    def stats(self) -> dict:
+        connections = [c for users in self.tenants.values() for sockets in users.values() for c in sockets]
+        return {
+            "connections": self.connection_count,
+            "users": sum(len(users) for users in self.tenants.values()),
+            "tenants": len(self.tenants),
+            "binary_connections": sum(1 for c in connections if c.binary),
+            "queued_frames": sum(c.queue.qsize() for c in connections),
+            "dropped_frames": self.dropped_frames + sum(c.dropped for c in connections),
+            "queue_max": WS_SEND_QUEUE_MAX,
+            "slow_consumer_policy": WS_SLOW_CONSUMER_POLICY,
+        }
+
+manager = ConnectionManager()
+message_bus.subscribe(manager.handle_bus_event)
+
+@app.on_event("startup")
+async def start_message_bus():
+    await message_bus.start()
+
+@app.on_event("shutdown")
+async def shutdown_message_bus():
+    await message_bus.shutdown()
+
+# Presence
+# Each worker tracks its own sockets in memory, and which workers hold a user's
+# sockets is shared through the college's `presence` collection: a worker adds
+# itself to the user's document when the user's first local socket opens and
+# removes itself after the last one closes. Only the worker that finds no other
+# live worker there announces user_online/user_offline, so a user connected to
+# several workers transitions once. Workers refresh their entries every flush;
+# entries older than PRESENCE_WORKER_TTL_SECONDS belong to a dead worker and its
+# users are announced offline by whichever worker reaps them first.
+# A user goes offline only after their last socket has been gone for
+# PRESENCE_OFFLINE_GRACE_SECONDS, so reconnects and page reloads don't flap. Once a client has sent a `ping` frame, going silent for
+# PRESENCE_TIMEOUT_SECONDS marks the socket dead; clients that never ping rely on
+# the server's protocol-level pings to notice a dropped connection. status/lastSeen are written to
+# the user collections in one bulk write per college every PRESENCE_FLUSH_SECONDS,
+# and transitions are sent only to people who share a conversation or group with
+# the user.
+PRESENCE_OFFLINE_GRACE_SECONDS = float(os.getenv("PRESENCE_OFFLINE_GRACE_SECONDS", "10"))
+PRESENCE_TIMEOUT_SECONDS = float(os.getenv("PRESENCE_TIMEOUT_SECONDS", "60"))
+PRESENCE_FLUSH_SECONDS = float(os.getenv("PRESENCE_FLUSH_SECONDS", "5"))
+PRESENCE_WORKER_TTL_SECONDS = float(os.getenv("PRESENCE_WORKER_TTL_SECONDS", "30"))
+
+# Identifies this process in state shared with the other workers
+WORKER_ID = f"{os.uname().nodename}:{os.getpid()}:{uuid4().hex[:8]}"
+
+class PresenceService:
+    def __init__(self, grace_seconds: float = PRESENCE_OFFLINE_GRACE_SECONDS,
+                 timeout_seconds: float = PRESENCE_TIMEOUT_SECONDS, flush_seconds: float = PRESENCE_FLUSH_SECONDS,
+                 worker_ttl_seconds: float = PRESENCE_WORKER_TTL_SECONDS):
+        self.grace = grace_seconds
+        self.timeout = timeout_seconds
+        self.flush_seconds = flush_seconds
+        self.worker_ttl = worker_ttl_seconds
+        self._online: dict = {}           # (collegeId, userId) -> (role, college_db)
+        self._pending_offline: dict = {}  # (collegeId, userId) -> TimerHandle
+        self._offline_tasks: set = set()  # _go_offline tasks started by expired timers
+        self._unjoined: set = set()       # (collegeId, userId) announced online without a presence entry
+        self._writes: dict = {}           # databaseName -> {(role, userId): fields to $set}
+        self._dbs: dict = {}
+        self._colleges: dict = {}         # collegeId -> college_db whose presence this worker maintains
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.transitions = 0
+        self.debounced = 0
+        self.timeouts = 0
+        self.writes = 0
+        self.reaped = 0
+
+    def record_seen(self, college_db, role: Optional[str], user_id, status: Optional[str] = None):
+        """Queue a lastSeen (and optionally status) update for the next batch."""
+        if role not in ("Student", "Alumni", "Admin"):
+            return
+        fields = {"lastSeen": get_current_time()}
+        if status:
+            fields["status"] = status
+        pending = self._writes.setdefault(college_db.name, {})
+        key = (role, str(user_id))
+        pending[key] = {**pending.get(key, {}), **fields}
+        self._dbs[college_db.name] = college_db
+        self._ensure_started()
+
+    async def connected(self, college_db, college_id: str, user_id: str, role: Optional[str]):
+        key = (college_id, user_id)
+        timer = self._pending_offline.pop(key, None)
+        if timer is not None:
+            # Back within the grace period: nobody saw them leave
+            timer.cancel()
+            self.debounced += 1
+            return
+        if key in self._online:
+            return
+        self._online[key] = (role, college_db)
+        self._colleges[college_id] = college_db
+        try:
+            first = await self._join(college_db, user_id, role)
+        except Exception as e:
+            print(f"Error updating shared presence for {college_id}:{user_id}: {e}")
+            # Announce anyway; _depart must then announce the leave without an entry to remove
+            self._unjoined.add(key)
+            first = True
+        if not first:
+            # Already online through another worker
+            self.record_seen(college_db, role, user_id)
+            return
+        self.record_seen(college_db, role, user_id, "online")
+        await self._announce(college_db, college_id, user_id, "user_online")
+
+    def disconnected(self, college_id: str, user_id: str, last_socket: bool):
+        key = (college_id, user_id)
+        if not last_socket or key not in self._online or key in self._pending_offline:
+            return
+        self._pending_offline[key] = asyncio.get_running_loop().call_later(
+            self.grace, self._start_go_offline, college_id, user_id
+        )
+
+    def _start_go_offline(self, college_id: str, user_id: str):
+        # The loop only keeps a weak reference to tasks
+        task = asyncio.create_task(self._go_offline(college_id, user_id))
+        self._offline_tasks.add(task)
+        task.add_done_callback(self._offline_tasks.discard)
+
+    async def _go_offline(self, college_id: str, user_id: str):
+        key = (college_id, user_id)
+        self._pending_offline.pop(key, None)
+        if manager.is_online(college_id, user_id):
+            return
+        role, college_db = self._online.pop(key, (None, None))
+        if college_db is None:
+            return
+        await self._depart(college_db, college_id, user_id, role)
+
+    async def _depart(self, college_db, college_id: str, user_id: str, role: Optional[str]):
+        try:
+            if (college_id, user_id) in self._unjoined:
+                # The join never reached the shared state, so there is no entry to remove
+                # and the online announcement was ours alone
+                self._unjoined.discard((college_id, user_id))
+                last = True
+            else:
+                last = await self._leave(college_db, user_id)
+        except Exception as e:
+            print(f"Error updating shared presence for {college_id}:{user_id}: {e}")
+            last = True
+        if not last:
+            # Still online through another worker
+            self.record_seen(college_db, role, user_id)
+            return
+        self.record_seen(college_db, role, user_id, "offline")
+        await self._announce(college_db, college_id, user_id, "user_offline")
+
+    def _live_filter(self, cutoff: datetime) -> dict:
+        """$filter keeping the other workers' entries that are still being refreshed."""
+        return {"$filter": {
+            "input": {"$ifNull": ["$workers", []]},
+            "cond": {"$and": [{"$ne": ["$$this.id", WORKER_ID]}, {"$gte": ["$$this.at", cutoff]}]},
+        }}
+
+    async def _join(self, college_db, user_id: str, role: Optional[str]) -> bool:
+        """Add this worker to user_id's presence; True if no other live worker holds the user."""
+        now = get_current_time()
+        cutoff = now - timedelta(seconds=self.worker_ttl)
+        before = await college_db.presence.find_one_and_update(
+            {"_id": user_id},
+            [{"$set": {"role": role, "workers": {"$concatArrays": [self._live_filter(cutoff), [{"id": WORKER_ID, "at": now}]]}}}],
+            upsert=True,
+        )
+        workers = (before or {}).get("workers", [])
+        return not any(w["id"] != WORKER_ID and w["at"] >= cutoff for w in workers)
+
+    async def _leave(self, college_db, user_id: str) -> bool:
+        """Remove this worker from user_id's presence; True if that left the user offline everywhere."""
+        cutoff = get_current_time() - timedelta(seconds=self.worker_ttl)
+        after = await college_db.presence.find_one_and_update(
+            {"_id": user_id},
+            [{"$set": {"workers": self._live_filter(cutoff)}}],
+            return_document=ReturnDocument.AFTER,
+        )
+        if after is None or after["workers"]:
+            # Gone means another worker reaped it and announced the transition already
+            return False
+        # Whoever deletes the emptied document owns the transition; a worker joining
+        # in between makes it non-empty again
+        result = await college_db.presence.delete_one({"_id": user_id, "workers": []})
+        return result.deleted_count == 1
+
+    async def refresh(self):
+        """Keep this worker's presence entries live and reap the users of dead workers."""
+        now = get_current_time()
+        cutoff = now - timedelta(seconds=self.worker_ttl)
+        for college_id, college_db in list(self._colleges.items()):
+            try:
+                await college_db.presence.update_many(
+                    {"workers.id": WORKER_ID},
+                    {"$set": {"workers.$[w].at": now}},
+                    array_filters=[{"w.id": WORKER_ID}],
+                )
+                # No entry has been refreshed within the TTL: every worker holding the user is gone
+                while doc := await college_db.presence.find_one_and_delete({"workers.at": {"$not": {"$gte": cutoff}}}):
+                    user_id = doc["_id"]
+                    if (college_id, user_id) in self._online:
+                        await self._join(college_db, user_id, doc.get("role"))
+                        continue
+                    self.reaped += 1
+                    self.record_seen(college_db, doc.get("role"), user_id, "offline")
+                    await self._announce(college_db, college_id, user_id, "user_offline")
+                # Retry joins that failed so other workers see these users again
+                for key in [key for key in self._unjoined if key[0] == college_id]:
+                    if key in self._unjoined and key in self._online:
+                        await self._join(college_db, key[1], self._online[key][0])
+                        self._unjoined.discard(key)
+            except Exception as e:
+                print(f"Error refreshing presence for {college_id}: {e}")
+
+    async def audience(self, college_db, college_id: str, user_id: str) -> set:
+        """Ids of users who share a direct conversation or a group with user_id."""
+        subject = ObjectId(user_id)
+        users = set()
+        async for conversation in college_db.userchats.find({"userId": subject, "type": "direct"}, {"conversationId": 1}):
+            users.add(str(conversation["conversationId"]))
+        async for group in college_db.groups.find({"members": subject}, {"_id": 1}):
+            users |= await group_members_cache.members(college_id, str(group["_id"]), college_db) or set()
+        users.discard(user_id)
+        return users
+
+    async def _announce(self, college_db, college_id: str, user_id: str, frame_type: str):
+        self.transitions += 1
+        try:
+            users = await self.audience(college_db, college_id, user_id)
+        except Exception as e:
+            print(f"Error resolving presence audience for {college_id}:{user_id}: {e}")
+            return
+        if users:
+            frame = encode_frame({
+                "type": frame_type,
+                "userId": ObjectId(user_id),
+                "lastSeen": get_current_time().astimezone(IST),
+            })
+            await manager.send_to_users(frame, users, college_id)
+
+    def sweep(self):
+        """Drop sockets that have been silent for longer than the liveness timeout."""
+        deadline = time.monotonic() - self.timeout
+        for users in list(manager.tenants.values()):
+            for sockets in list(users.values()):
+                for connection in list(sockets):
+                    if connection.heartbeats and connection.last_active < deadline:
+                        self.timeouts += 1
+                        connection.close(code=1001, reason="Heartbeat timeout")
+                        self.disconnected(connection.college_id, connection.user_id, manager.disconnect(connection))
+
+    def _ensure_started(self):
+        if self._closed:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            self.sweep()
+            await self.flush()
+            await self.refresh()
+
+    async def flush(self):
+        writes, self._writes = self._writes, {}
+        for db_name, users in writes.items():
+            by_role = {}
+            for (role, user_id), fields in users.items():
+                by_role.setdefault(role, {})[user_id] = fields
+            for role, fields_by_user in by_role.items():
+                ops = [UpdateOne({"_id": ObjectId(user_id)}, {"$set": fields}) for user_id, fields in fields_by_user.items()]
                 try:
-                    await self.active_connections[key].send_text(message)
-                    print(f"Sent group message to {member_id_str}: {message}")
+                    await self._dbs[db_name][role].bulk_write(ops, ordered=False)
+                    self.writes += len(ops)
                 except Exception as e:
-                    print(f"Error sending to {member_id_str}: {e}")
-            else:
-                print(f"Member {member_id_str} not connected in college {college_id}")
+                    # Retry next time unless a newer update for the user has been queued since
+                    print(f"Error saving presence for {db_name}.{role}: {e}")
+                    retry = self._writes.setdefault(db_name, {})
+                    for user_id, fields in fields_by_user.items():
+                        retry.setdefault((role, user_id), fields)
+
+    async def shutdown(self):
+        # record_seen() below must not restart the background task
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for timer in self._pending_offline.values():
+            timer.cancel()
+        await asyncio.gather(*self._offline_tasks, return_exceptions=True)
+        # Whoever is still connected is about to be disconnected by the shutdown
+        online, self._online = self._online, {}
+        self._pending_offline.clear()
+        await asyncio.gather(*(
+            self._depart(college_db, college_id, user_id, role)
+            for (college_id, user_id), (role, college_db) in online.items()
+        ), return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "online": len(self._online),
+            "pending_offline": len(self._pending_offline),
+            "pending_writes": sum(len(users) for users in self._writes.values()),
+            "transitions": self.transitions,
+            "debounced": self.debounced,
+            "timeouts": self.timeouts,
+            "writes": self.writes,
+            "reaped": self.reaped,
+        }
 
-manager = ConnectionManager()
+presence = PresenceService()
+
+@app.on_event("shutdown")
+async def shutdown_presence():
+    await presence.shutdown()
+
+# Message persistence
+# With MESSAGE_WRITE_BEHIND enabled, chat messages get their _id up front, are
+# delivered immediately and are written by a background task in insert_many
+# batches (flushed at MESSAGE_BATCH_SIZE or after MESSAGE_BATCH_DELAY_MS).
+# Failed batches are retried, then spilled to a local JSONL file that is
+# replayed once MongoDB accepts writes again. Otherwise save() is insert_one.
+MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "200"))
+MESSAGE_BATCH_DELAY_MS = float(os.getenv("MESSAGE_BATCH_DELAY_MS", "10"))
+MESSAGE_BUFFER_MAX = int(os.getenv("MESSAGE_BUFFER_MAX", "10000"))
+MESSAGE_WRITE_RETRIES = int(os.getenv("MESSAGE_WRITE_RETRIES", "3"))
+MESSAGE_SPILL_DIR = os.getenv("MESSAGE_SPILL_DIR", os.path.join("data", "spill"))
+
+class MessageStore:
+    def __init__(self, write_behind: bool = MESSAGE_WRITE_BEHIND, batch_size: int = MESSAGE_BATCH_SIZE,
+                 delay_ms: float = MESSAGE_BATCH_DELAY_MS, max_pending: int = MESSAGE_BUFFER_MAX,
+                 retries: int = MESSAGE_WRITE_RETRIES, spill_dir: str = MESSAGE_SPILL_DIR):
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.delay = delay_ms / 1000
+        self.max_pending = max_pending
+        self.retries = retries
+        self.spill_dir = spill_dir
+        self._buffers: dict = {}  # databaseName -> list of message documents
+        self._dbs: dict = {}
+        self.pending = 0
+        self._has_data: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Condition] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._spilled = False
+        self.saved = 0
+        self.batches = 0
+        self.retried = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.backpressure_waits = 0
+
+    async def save(self, college_db, message: dict) -> dict:
+        """Persist a message document (assigning its _id) and return it."""
+        message.setdefault("_id", ObjectId())
+        self.saved += 1
+        if self.write_behind and not self._closed:
+            self._ensure_started()
+            if self.pending >= self.max_pending:
+                # Bound memory: hold this sender until in-flight batches are written
+                # (or spilled) and pending drops below the limit again
+                self.backpressure_waits += 1
+                self._batch_full.set()
+                async with self._drained:
+                    await self._drained.wait_for(lambda: self.pending < self.max_pending)
+        if not self.write_behind or self._closed:
+            # Also after shutdown(), when nothing would flush the buffers any more
+            await college_db.messages.insert_one(message)
+            return message
+
+        buffer = self._buffers.setdefault(college_db.name, [])
+        self._dbs[college_db.name] = college_db
+        buffer.append(message)
+        self.pending += 1
+        self._has_data.set()
+        if len(buffer) >= self.batch_size:
+            self._batch_full.set()
+        return message
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._has_data = asyncio.Event()
+            self._batch_full = asyncio.Event()
+            self._drained = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._closed:
+            await self._has_data.wait()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.delay)
+            except asyncio.TimeoutError:
+                pass
+            self._has_data.clear()
+            self._batch_full.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything buffered so far. Flushes are serialised, so on return every
+        message saved before the call has been written (or spilled)."""
+        async with self._flush_lock:
+            buffers, self._buffers = self._buffers, {}
+            spilled_before = self.spilled
+            await asyncio.gather(*(
+                self._write(db_name, documents[start:start + self.batch_size])
+                for db_name, documents in buffers.items()
+                for start in range(0, len(documents), self.batch_size)
+            ))
+            # Once a flush goes through cleanly, MongoDB is back: replay what was spilled
+            if self._spilled and buffers and self.spilled == spilled_before:
+                await self.replay_spill()
+
+    async def _write(self, db_name: str, documents: List[dict]):
+        try:
+            remaining = documents
+            for attempt in range(self.retries + 1):
+                try:
+                    await self._dbs[db_name].messages.insert_many(remaining, ordered=False)
+                    self.batches += 1
+                    return
+                except BulkWriteError as e:
+                    # Duplicate keys mean an earlier attempt already wrote the document
+                    failed = {
+                        error["index"] for error in e.details.get("writeErrors", [])
+                        if error.get("code") != 11000
+                    }
+                    if not failed and not e.details.get("writeConcernErrors"):
+                        self.batches += 1
+                        return
+                    if failed:
+                        remaining = [doc for index, doc in enumerate(remaining) if index in failed]
+                    error = e
+                except Exception as e:
+                    error = e
+                if attempt < self.retries:
+                    self.retried += 1
+                    await asyncio.sleep(0.05 * 2 ** attempt)
+            print(f"Spilling {len(remaining)} messages for {db_name} after error: {error}")
+            await asyncio.to_thread(self._spill, db_name, remaining)
+        finally:
+            self.pending -= len(documents)
+            if self._drained is not None:
+                async with self._drained:
+                    self._drained.notify_all()
+
+    def _spill_path(self, db_name: str) -> str:
+        return os.path.join(self.spill_dir, f"{db_name}.messages.jsonl")
+
+    def _spill(self, db_name: str, documents: List[dict]):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with open(self._spill_path(db_name), "a") as f:
+            for doc in documents:
+                f.write(json_util.dumps(doc) + "\n")
+        self._spilled = True
+        self.spilled += len(documents)
+
+    def _take_spill(self, db_name: str) -> List[dict]:
+        path = self._spill_path(db_name)
+        replay_path = path + ".replay"
+        try:
+            os.replace(path, replay_path)
+        except FileNotFoundError:
+            return []
+        with open(replay_path) as f:
+            documents = [json_util.loads(line) for line in f if line.strip()]
+        os.remove(replay_path)
+        return documents
+
+    async def replay_spill(self):
+        """Write spilled messages back to MongoDB; anything that fails is spilled again."""
+        self._spilled = False
+        if not os.path.isdir(self.spill_dir):
+            return
+        for name in await asyncio.to_thread(os.listdir, self.spill_dir):
+            if not name.endswith(".messages.jsonl"):
+                continue
+            db_name = name[:-len(".messages.jsonl")]
+            documents = await asyncio.to_thread(self._take_spill, db_name)
+            if not documents:
+                continue
+            self._dbs.setdefault(db_name, client[db_name])
+            self.replayed += len(documents)
+            self.pending += len(documents)
+            for start in range(0, len(documents), self.batch_size):
+                await self._write(db_name, documents[start:start + self.batch_size])
+
+    async def shutdown(self):
+        # Stop the writer after its current flush instead of cancelling it: a
+        # cancelled insert_many would drop its batch, and wait_for() can swallow
+        # the cancellation and leave shutdown waiting forever
+        self._closed = True
+        if self._task is not None:
+            self._has_data.set()
+            self._batch_full.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "write_behind": self.write_behind,
+            "pending": self.pending,
+            "saved": self.saved,
+            "batches": self.batches,
+            "retried": self.retried,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+message_store = MessageStore()
+
+@app.on_event("startup")
+async def replay_spilled_messages():
+    if message_store.write_behind:
+        await message_store.replay_spill()
+
+@app.on_event("shutdown")
+async def shutdown_message_store():
+    await message_store.shutdown()
+
+# Conversations
+# userchats holds one summary per (userId, conversationId), where conversationId
+# is the peer's id for direct chats and the group's id for group chats, so the
+# inbox is a single indexed read instead of a scan over recent messages. Sending
+# only queues the message; a background task folds everything queued in the last
+# CONVERSATION_FLUSH_MS into one upsert per participant and conversation, so a
+# burst in a large group costs one write per member rather than one per member
+# per message. Summaries may lag the message by up to one flush.
+CONVERSATION_FLUSH_MS = float(os.getenv("CONVERSATION_FLUSH_MS", "100"))
+CONVERSATION_BATCH_SIZE = int(os.getenv("CONVERSATION_BATCH_SIZE", "1000"))
+
+class ConversationStore:
+    def __init__(self, flush_ms: float = CONVERSATION_FLUSH_MS):
+        self.flush_seconds = flush_ms / 1000
+        self._pending: dict = {}     # databaseName -> [(collegeId, message)]
+        self._dbs: dict = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @staticmethod
+    def summary_update(user_id: ObjectId, conversation_id: ObjectId, kind: str, message: dict, unread: int) -> UpdateOne:
+        timestamp = message["timestamp"]
+        last_message = {
+            "_id": message["_id"],
+            "content": message.get("content"),
+            "senderId": message["senderId"],
+            "timestamp": timestamp,
+        }
+        # Pipeline update: the unread count always moves, but a message that
+        # arrives late (write-behind, retries) must not replace a newer preview
+        newer = {"$gte": [timestamp, {"$ifNull": ["$lastMessageAt", timestamp]}]}
+        return UpdateOne(
+            {"userId": user_id, "conversationId": conversation_id},
+            [{"$set": {
+                "type": kind,
+                "unread": {"$add": [{"$ifNull": ["$unread", 0]}, unread]},
+                "lastMessage": {"$cond": [newer, {"$literal": last_message}, "$lastMessage"]},
+                "lastMessageAt": {"$cond": [newer, timestamp, "$lastMessageAt"]},
+            }}],
+            upsert=True,
+        )
+
+    def record(self, college_db, college_id: str, message: dict):
+        """Queue a newly saved message for its participants' conversation summaries."""
+        if not (message.get("groupId") or message.get("receiverId")):
+            return
+        self._pending.setdefault(college_db.name, []).append((college_id, message))
+        self._dbs[college_db.name] = college_db
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def flush(self, db_name: Optional[str] = None):
+        """Write the queued summaries, for one database or all. Returns once earlier flushes have finished too."""
+        async with self._lock:
+            for name in [db_name] if db_name else list(self._pending):
+                messages = self._pending.pop(name, None)
+                if messages:
+                    await self._write(self._dbs[name], messages)
+
+    async def _write(self, college_db, messages: list):
+        summaries = {}   # (userId, conversationId) -> [kind, latest message, unread]
+        members_by_group = {}
+        try:
+            for college_id, message in messages:
+                sender_id = message["senderId"]
+                if message.get("groupId"):
+                    group_id = message["groupId"]
+                    if group_id not in members_by_group:
+                        members = await group_members_cache.members(college_id, str(group_id), college_db) or set()
+                        members_by_group[group_id] = {ObjectId(member) for member in members}
+                    targets = [
+                        (member, group_id, "group", 0 if member == sender_id else 1)
+                        for member in members_by_group[group_id] | {sender_id}
+                    ]
+                else:
+                    receiver_id = message["receiverId"]
+                    targets = [(sender_id, receiver_id, "direct", 0)]
+                    if receiver_id != sender_id:
+                        targets.append((receiver_id, sender_id, "direct", 1))
+                for user_id, conversation_id, kind, unread in targets:
+                    summary = summaries.get((user_id, conversation_id))
+                    if summary is None:
+                        summaries[(user_id, conversation_id)] = [kind, message, unread]
+                        continue
+                    self.coalesced += 1
+                    summary[2] += unread
+                    if message["timestamp"] >= summary[1]["timestamp"]:
+                        summary[1] = message
+            updates = [
+                self.summary_update(user_id, conversation_id, kind, message, unread)
+                for (user_id, conversation_id), (kind, message, unread) in summaries.items()
+            ]
+            for start in range(0, len(updates), CONVERSATION_BATCH_SIZE):
+                await college_db.userchats.bulk_write(updates[start:start + CONVERSATION_BATCH_SIZE], ordered=False)
+                self.updates += len(updates[start:start + CONVERSATION_BATCH_SIZE])
+        except Exception as e:
+            # The messages themselves are saved; `python app.py rebuild-conversations` repairs summaries
+            self.errors += 1
+            print(f"Error updating conversations for {len(messages)} messages in {college_db.name}: {e}")
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def rebuild(self, college_db) -> int:
+        """Recompute every summary from the messages collection; returns the number written."""
+        groups = {}
+        async for group in college_db.groups.find({}, {"members": 1}):
+            groups[group["_id"]] = set(group.get("members", []))
+        summaries = {}
+
+        def fold(user_id, conversation_id, kind, message, unread):
+            summary = summaries.setdefault((user_id, conversation_id), {"type": kind, "unread": 0})
+            summary["unread"] += unread
+            summary["lastMessage"] = {
+                "_id": message["_id"],
+                "content": message.get("content"),
+                "senderId": message["senderId"],
+                "timestamp": message["timestamp"],
+            }
+            summary["lastMessageAt"] = message["timestamp"]
+
+        projection = {"content": 1, "senderId": 1, "receiverId": 1, "groupId": 1, "timestamp": 1, "isRead": 1}
+        async for message in college_db.messages.find({}, projection).sort([("timestamp", ASCENDING), ("_id", ASCENDING)]):
+            sender_id = message["senderId"]
+            if message.get("groupId"):
+                # Group messages carry no per-member read state, so they rebuild as read
+                for member in groups.get(message["groupId"], set()) | {sender_id}:
+                    fold(member, message["groupId"], "group", message, 0)
+            elif message.get("receiverId"):
+                receiver_id = message["receiverId"]
+                fold(sender_id, receiver_id, "direct", message, 0)
+                if receiver_id != sender_id:
+                    fold(receiver_id, sender_id, "direct", message, 0 if message.get("isRead") else 1)
+
+        updates = [
+            UpdateOne({"userId": user_id, "conversationId": conversation_id}, {"$set": summary}, upsert=True)
+            for (user_id, conversation_id), summary in summaries.items()
+        ]
+        for start in range(0, len(updates), BULK_CHUNK_SIZE):
+            await college_db.userchats.bulk_write(updates[start:start + BULK_CHUNK_SIZE], ordered=False)
+        return len(updates)
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(len(messages) for messages in self._pending.values()),
+            "updates": self.updates,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+conversation_store = ConversationStore()
+
+@app.on_event("shutdown")
+async def shutdown_conversation_store():
+    await conversation_store.shutdown()
+
+# Read receipts
+# Marking a conversation read is one update_many over the reader's unread
+# messages up to a cursor, followed by a fix-up of the reader's summary and a
+# `read` frame to the peer and the reader's other sockets. WebSocket `read`
+# frames are coalesced per connection so a client scrolling through history
+# costs one write per conversation per window rather than one per message.
+READ_RECEIPT_WINDOW_MS = float(os.getenv("READ_RECEIPT_WINDOW_MS", "500"))
+
+def read_receipt_target(peer_id: Optional[str], group_id: Optional[str]):
+    """Validate a receipt's conversation and return (kind, conversation id)."""
+    if bool(peer_id) == bool(group_id):
+        raise HTTPException(status_code=400, detail="Provide exactly one of peerId or groupId")
+    conversation_id = peer_id or group_id
+    if not ObjectId.is_valid(conversation_id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    return ("direct" if peer_id else "group"), ObjectId(conversation_id)
+
+class ReadReceiptService:
+    def __init__(self):
+        self.receipts = 0
+        self.coalesced = 0
+        self.messages_marked = 0
+
+    async def mark_read(self, college_db, college_id: str, user_id: str, kind: str,
+                        conversation_id: ObjectId, up_to) -> int:
+        """Mark the conversation read up to the (timestamp, _id) position; returns messages updated."""
+        timestamp, message_id = up_to
+        reader_id = ObjectId(user_id)
+        now = get_current_time()
+        self.receipts += 1
+        # Messages still in the write-behind buffer would be missed by update_many, and
+        # unread counts queued for the summary must land before they are corrected below
+        if message_store.write_behind:
+            await message_store.flush()
+        await conversation_store.flush(college_db.name)
+        summary_filter = {"userId": reader_id, "conversationId": conversation_id}
+        # Everything at or before the cursor
+        position = {"timestamp": {"$lte": timestamp}, "$nor": [{"timestamp": timestamp, "_id": {"$gt": message_id}}]}
+
+        if kind == "direct":
+            result = await college_db.messages.update_many(
+                {"senderId": conversation_id, "receiverId": reader_id, "isRead": False, **position},
+                {"$set": {"isRead": True, "readAt": now}}
+            )
+            updated = result.modified_count
+            if updated:
+                await college_db.userchats.update_one(summary_filter, [{"$set": {
+                    "unread": {"$max": [0, {"$subtract": [{"$ifNull": ["$unread", 0]}, updated]}]},
+                }}])
+        else:
+            # Group messages have no per-member flag; the reader's position lives in the summary
+            updated = 0
+            unread = await college_db.messages.count_documents({
+                "groupId": conversation_id,
+                "senderId": {"$ne": reader_id},
+                "timestamp": {"$gte": timestamp},
+                "$nor": [{"timestamp": timestamp, "_id": {"$lte": message_id}}],
+            })
+            await college_db.userchats.update_one(
+                {**summary_filter, "$or": [{"readUpTo": {"$exists": False}}, {"readUpTo": {"$lte": timestamp}}]},
+                {"$set": {"unread": unread, "readUpTo": timestamp}}
+            )
+        self.messages_marked += updated
+
+        data = {
+            "readerId": ObjectId(user_id),
+            "upTo": encode_cursor(timestamp, message_id),
+            "readAt": now.astimezone(IST),
+            ("peerId" if kind == "direct" else "groupId"): conversation_id,
+        }
+        frame = encode_frame({"type": "read", "data": data})
+        if kind == "direct" and updated:
+            await manager.send_personal_message(frame, str(conversation_id), college_id)
+        await manager.send_personal_message(frame, user_id, college_id)
+        return updated
+
+    def stats(self) -> dict:
+        return {"receipts": self.receipts, "coalesced": self.coalesced, "messages_marked": self.messages_marked}
+
+read_receipts = ReadReceiptService()
+
+# Resume
+# After a reconnect the client sends {"type": "resume", "cursor": <last message
+# cursor it saw>}. Missed direct and group messages are replayed oldest first,
+# at most RESUME_PAGE_SIZE per resume frame, followed by a resume_page frame
+# telling the client whether to ask for the next page. Live frames for the
+# connection are held while a page is read and replayed, then delivered minus
+# anything the page already covered.
+RESUME_PAGE_SIZE = min(int(os.getenv("RESUME_PAGE_SIZE", "100")), WS_SEND_QUEUE_MAX // 2)
+
+async def sender_names(college_db, sender_ids: set) -> dict:
+    names = {}
+    lookups = [college_db[role].find({"_id": {"$in": list(sender_ids)}}, {"name": 1}) for role in ("Student", "Alumni", "Admin")]
+    for cursor in lookups:
+        async for user in cursor:
+            names[user["_id"]] = user.get("name")
+    return names
+
+async def replay_missed_messages(connection: ClientConnection, college_db, cursor: str, limit: int = RESUME_PAGE_SIZE):
+    """Send one page of messages newer than cursor to the connection."""
+    # Rejects a malformed cursor with a 400 before any state is touched
+    decode_cursor(cursor)
+    user_id = ObjectId(connection.user_id)
+    if connection.resume is None:
+        connection.resume = ResumeState()
+    connection.resume.held = []
+    replayed = set()
+    has_more = False
+    try:
+        groups = [group["_id"] async for group in college_db.groups.find({"members": user_id}, {"_id": 1})]
+        branches = [{"receiverId": user_id}, {"senderId": user_id}]
+        if groups:
+            branches.append({"groupId": {"$in": groups}})
+        query, direction = keyset_page_query(branches, None, cursor)
+        page = await college_db.messages.find(query).sort([("timestamp", direction), ("_id", direction)]).to_list(length=limit + 1)
+        has_more = len(page) > limit
+        page = page[:limit]
+        group_senders = {message["senderId"] for message in page if message.get("groupId")}
+        names = await sender_names(college_db, group_senders) if group_senders else {}
+
+        for message in page:
+            message_id = str(message["_id"])
+            if message_id in connection.resume.delivered:
+                continue
+            if message.get("groupId"):
+                frame = {"type": "group_message", "data": serialize_ws_message(message, senderName=names.get(message["senderId"], "Unknown"))}
+            else:
+                frame = {"type": "message", "data": serialize_ws_message(message)}
+            connection.send(encode_frame(frame), replay=True)
+            replayed.add(message_id)
+
+        last = encode_cursor(page[-1]["timestamp"], page[-1]["_id"]) if page else cursor
+        connection.send(encode_frame({"type": "resume_page", "data": {"cursor": last, "hasMore": has_more}}), replay=True)
+    finally:
+        connection.release_held(frozenset(replayed))
+        if not has_more:
+            # Caught up: back to plain live delivery
+            connection.resume = None
+
+class ReadReceiptBuffer:
+    """One connection's pending read frames: the furthest cursor per conversation, written once per window."""
+
+    def __init__(self, college_db, college_id: str, user_id: str, window_ms: float = READ_RECEIPT_WINDOW_MS):
+        self.college_db = college_db
+        self.college_id = college_id
+        self.user_id = user_id
+        self.window = window_ms / 1000
+        self._pending: dict = {}  # (kind, conversation id) -> (timestamp, _id)
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, kind: str, conversation_id: ObjectId, up_to):
+        key = (kind, conversation_id)
+        current = self._pending.get(key)
+        if current is not None:
+            read_receipts.coalesced += 1
+            up_to = max(current, up_to)
+        self._pending[key] = up_to
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._task = None
+        await self.flush()
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        for (kind, conversation_id), up_to in pending.items():
+            try:
+                await read_receipts.mark_read(self.college_db, self.college_id, self.user_id, kind, conversation_id, up_to)
+            except Exception as e:
+                print(f"Error saving read receipt for {self.college_id}:{self.user_id}: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
 
 async def initialize_college_meta(college_db):
     """Initialize the meta collection for a new college"""
@@ -453,6 +2216,7 @@ async def create_college(request: CollegeRegistrationRequest):
     # Do NOT store password in college_dict
 
     await SaaS_Management.colleges.insert_one(college_dict)
+    await tenant_registry.evict(college.collegeId)
 
     # Create the admin user in the college's database using college details
     college_db = client[database_name]
@@ -464,7 +2228,7 @@ async def create_college(request: CollegeRegistrationRequest):
         password=admin_password
     )
     admin_dict = admin_obj.dict(exclude_none=True)
-    admin_dict["password"] = get_password_hash(admin_dict["password"])
+    admin_dict["password"] = await get_password_hash_async(admin_dict["password"])
     await college_db["Admin"].insert_one(admin_dict)
     
     # Initialize meta collection
@@ -477,22 +2241,20 @@ async def create_college(request: CollegeRegistrationRequest):
 
 @app.post("/login")
 async def login(credentials: LoginSchema, response: Response):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": credentials.collegeId})
+    college = await tenant_registry.get(credentials.collegeId)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
-    college_db = client[college["databaseName"]]
+    college_db = college["db"]
     user = await college_db[credentials.userType].find_one({"email": credentials.email})
     if not user:
         raise HTTPException(status_code=400, detail="User not found")
-    if not verify_password(credentials.password, user["password"]):
+    if not await verify_password_async(credentials.password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    await college_db[credentials.userType].update_one(
-        {"_id": user["_id"]},
-        {"$set": {"lastSeen": get_current_time(), "status": "online"}}
-    )
+    # Online status comes from the WebSocket; login only counts as being seen
+    presence.record_seen(college_db, credentials.userType, user["_id"])
+    principal_cache.invalidate(credentials.collegeId, credentials.userType, credentials.email)
 
     user["_id"] = str(user["_id"])
     token = create_access_token(user, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -531,69 +2293,324 @@ async def login(credentials: LoginSchema, response: Response):
     }
 
 
+# Analytics rollups
+# Per-college "rollups" documents hold one counter per (metric, granularity,
+# bucket start), _id "<metric>:<granularity>:<YYYY-MM-DDTHH>". Writers record
+# increments in process and a background task flushes them with one unordered
+# bulk_write of $inc upserts per college, so hot paths (chat messages) don't pay
+# a round trip per event. Range queries sum a handful of month/day/hour buckets.
+ROLLUP_GRANULARITIES = ("hour", "day", "month")
+ROLLUP_METRICS = ("students", "alumni", "achievements", "donations", "messages", "active_users")
+ROLLUP_FLUSH_SECONDS = float(os.getenv("ROLLUP_FLUSH_SECONDS", "2"))
+ROLLUP_MAX_BUCKETS = 1000
+# rollup_members only deduplicates active users within the current day and
+# month buckets; a TTL on the bucket start drops them a month after the longest
+# bucket has closed
+ROLLUP_MEMBERS_TTL_SECONDS = int(os.getenv("ROLLUP_MEMBERS_TTL_SECONDS", str(62 * 24 * 3600)))
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_bucket(start: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return start + timedelta(hours=1)
+    if granularity == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def rollup_id(metric: str, granularity: str, start: datetime) -> str:
+    return f"{metric}:{granularity}:{start:%Y-%m-%dT%H}"
+
+def bucket_end(moment: datetime, granularity: str) -> datetime:
+    """moment rounded up to the next bucket boundary (unchanged if already on one)."""
+    start = bucket_start(moment, granularity)
+    return start if start == moment else next_bucket(start, granularity)
+
+def cover_range(start: datetime, end: datetime):
+    """Split [start, end) into the fewest month/day/hour buckets, widened to whole hours."""
+    current = bucket_start(start, "hour")
+    # Round up like rollup_series, which includes every bucket starting before end
+    end = bucket_end(end, "hour")
+    parts = []
+    while current < end:
+        for granularity in ("month", "day", "hour"):
+            following = next_bucket(current, granularity)
+            if bucket_start(current, granularity) == current and following <= end:
+                parts.append((granularity, current))
+                current = following
+                break
+    return parts
+
+class RollupRecorder:
+    def __init__(self, flush_seconds: float = ROLLUP_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: dict = {}     # databaseName -> {(metric, granularity, start): amount}
+        self._active: dict = {}      # databaseName -> set of (user_id, day start) waiting to be deduplicated
+        self._active_seen: set = set()  # (databaseName, user_id, day start) already handled by this process
+        self._active_day = None
+        self._dbs: dict = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_counters = 0
+        self.failed_flushes = 0
+
+    def record(self, college_db, metric: str, amount: float = 1, at: Optional[datetime] = None,
+               granularities=ROLLUP_GRANULARITIES):
+        at = at or get_current_time()
+        counters = self._pending.setdefault(college_db.name, {})
+        self._dbs[college_db.name] = college_db
+        for granularity in granularities:
+            key = (metric, granularity, bucket_start(at, granularity))
+            counters[key] = counters.get(key, 0) + amount
+        self._ensure_started()
+
+    def record_active(self, college_db, user_id):
+        """Count user_id once in today's and this month's active_users buckets."""
+        day = bucket_start(get_current_time(), "day")
+        if day != self._active_day:
+            self._active_day = day
+            self._active_seen.clear()
+        key = (college_db.name, str(user_id), day)
+        if key in self._active_seen:
+            return
+        self._active_seen.add(key)
+        self._dbs[college_db.name] = college_db
+        self._active.setdefault(college_db.name, set()).add((str(user_id), day))
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def _dedupe_active(self, college_db, members):
+        # Other workers may have counted the same user; the members collection decides
+        ops = []
+        keys = []
+        for user_id, day in members:
+            for granularity in ("day", "month"):
+                start = bucket_start(day, granularity)
+                member_id = f"{rollup_id('active_users', granularity, start)}:{user_id}"
+                ops.append(UpdateOne({"_id": member_id}, {"$setOnInsert": {"start": start}}, upsert=True))
+                keys.append((granularity, start))
+        result = await college_db["rollup_members"].bulk_write(ops, ordered=False)
+        counters = self._pending.setdefault(college_db.name, {})
+        for index in result.upserted_ids:
+            granularity, start = keys[index]
+            key = ("active_users", granularity, start)
+            counters[key] = counters.get(key, 0) + 1
+
+    async def flush(self):
+        active, self._active = self._active, {}
+        for db_name, members in active.items():
+            try:
+                await self._dedupe_active(self._dbs[db_name], members)
+            except Exception as e:
+                print(f"Error recording active users for {db_name}: {e}")
+                self._active.setdefault(db_name, set()).update(members)
+
+        pending, self._pending = self._pending, {}
+        for db_name, counters in pending.items():
+            ops = [
+                UpdateOne(
+                    {"_id": rollup_id(metric, granularity, start)},
+                    {
+                        "$inc": {"value": amount},
+                        "$setOnInsert": {"metric": metric, "granularity": granularity, "start": start},
+                    },
+                    upsert=True
+                )
+                for (metric, granularity, start), amount in counters.items()
+            ]
+            try:
+                await self._dbs[db_name]["rollups"].bulk_write(ops, ordered=False)
+                self.flushed_counters += len(ops)
+            except Exception as e:
+                # Keep the increments for the next flush instead of losing them
+                print(f"Error flushing rollups for {db_name}: {e}")
+                self.failed_flushes += 1
+                retry = self._pending.setdefault(db_name, {})
+                for key, amount in counters.items():
+                    retry[key] = retry.get(key, 0) + amount
+        self.flushes += 1
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_counters": sum(len(counters) for counters in self._pending.values()),
+            "flushes": self.flushes,
+            "flushed_counters": self.flushed_counters,
+            "failed_flushes": self.failed_flushes,
+        }
+
+rollup_recorder = RollupRecorder()
+
+@app.on_event("shutdown")
+async def shutdown_rollup_recorder():
+    await rollup_recorder.shutdown()
+
+async def rollup_total(college_db, metric: str, start: datetime, end: datetime) -> float:
+    ids = [rollup_id(metric, granularity, bucket) for granularity, bucket in cover_range(start, end)]
+    if not ids:
+        return 0
+    total = 0
+    async for bucket in college_db["rollups"].find({"_id": {"$in": ids}}, {"value": 1}):
+        total += bucket["value"]
+    return total
+
+async def rollup_series(college_db, metric: str, granularity: str, start: datetime, end: datetime) -> List[dict]:
+    """Bucket values in [start, end); "week" is summed from day buckets (weeks start on Monday)."""
+    source = "day" if granularity == "week" else granularity
+    values: dict = {}
+    async for bucket in college_db["rollups"].find(
+        {"metric": metric, "granularity": source, "start": {"$gte": bucket_start(start, source), "$lt": end}},
+        {"start": 1, "value": 1}
+    ).sort("start", 1):
+        key = bucket["start"]
+        if granularity == "week":
+            key = key - timedelta(days=key.weekday())
+        values[key] = values.get(key, 0) + bucket["value"]
+    return [{"start": key, "value": value} for key, value in values.items()]
+
+async def rebuild_rollups(college_db, metric: str, collection: str, date_field: str, value):
+    """Replace a metric's hour/day/month buckets with counts aggregated from its source collection."""
+    requests = []
+    for granularity in ROLLUP_GRANULARITIES:
+        rows = await college_db[collection].aggregate([
+            {"$match": {date_field: {"$type": "date"}}},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": f"${date_field}", "unit": granularity}},
+                "value": {"$sum": value}
+            }}
+        ]).to_list(length=None)
+        for row in rows:
+            requests.append(InsertOne({
+                "_id": rollup_id(metric, granularity, row["_id"]),
+                "metric": metric,
+                "granularity": granularity,
+                "start": row["_id"],
+                "value": row["value"],
+            }))
+    await college_db["rollups"].delete_many({"metric": metric})
+    if requests:
+        await college_db["rollups"].bulk_write(requests, ordered=False)
+
+# College meta counters
+# Totals live in the single "meta" document and are maintained with atomic $inc
+# upserts, so concurrent writers never lose updates. Per-month activity comes
+# from the month rollup buckets, so growth figures read two documents instead
+# of scanning the source collections.
+META_COUNTERS = {
+    # update_type: (total field on meta, rollup metric)
+    "student": ("total_students", "students"),
+    "alumni": ("total_alumni", "alumni"),
+    "achievement": ("total_achievements", "achievements"),
+    "donation": ("total_donations", "donations"),
+}
+
 async def update_college_meta(college_db, update_type, count=1):
-    """Update meta collection statistics"""
-    meta = await college_db["meta"].find_one({})
-    if not meta:
-        meta = await initialize_college_meta(college_db)
-    
-    updates = {}
+    """Update meta collection statistics. For donations, count is the donation amount."""
     current_time = get_current_time()
-    current_month = current_time.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    if update_type == "student":
-        updates["total_students"] = meta["total_students"] + count
-    elif update_type == "alumni":
-        updates["total_alumni"] = meta["total_alumni"] + count
-    elif update_type == "achievement":
-        updates["total_achievements"] = meta["total_achievements"] + count
-        updates["recent_achievements"] = meta.get("recent_achievements", 0) + count
-        
-        # Calculate growth percentage
-        last_month = (current_month.replace(day=1) - timedelta(days=1)).replace(day=1)
-        last_month_achievements = await college_db["achievements"].count_documents({
-            "createdAt": {"$gte": last_month, "$lt": current_month}
-        })
-        current_month_achievements = await college_db["achievements"].count_documents({
-            "createdAt": {"$gte": current_month}
-        })
-        
-        if last_month_achievements > 0:
-            growth = ((current_month_achievements - last_month_achievements) / last_month_achievements) * 100
-            updates["achievements_growth_percent"] = growth
-    elif update_type == "donation":
-        amount = count  # In this case, count is the donation amount
-        updates["total_donations"] = meta["total_donations"] + amount
-        updates["recent_donations"] = meta.get("recent_donations", 0) + amount
-        
-        # Calculate growth percentage
-        last_month = (current_month.replace(day=1) - timedelta(days=1)).replace(day=1)
-        last_month_donations = await college_db["donations"].aggregate([
-            {"$match": {"createdAt": {"$gte": last_month, "$lt": current_month}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]).to_list(length=1)
-        
-        current_month_donations = await college_db["donations"].aggregate([
-            {"$match": {"createdAt": {"$gte": current_month}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]).to_list(length=1)
-        
-        last_month_total = last_month_donations[0]["total"] if last_month_donations else 0
-        current_month_total = current_month_donations[0]["total"] if current_month_donations else 0
-        
-        if last_month_total > 0:
-            growth = ((current_month_total - last_month_total) / last_month_total) * 100
-            updates["donations_growth_percent"] = growth
+
+    if update_type in META_COUNTERS:
+        total_field, metric = META_COUNTERS[update_type]
+        await college_db["meta"].update_one(
+            {},
+            {"$inc": {total_field: count}, "$set": {"last_updated": current_time}},
+            upsert=True
+        )
+        rollup_recorder.record(college_db, metric, count, current_time)
     elif update_type == "group":
-        updates["active_groups"] = await college_db["groups"].count_documents({"status": "active"})
+        active_groups = await college_db["groups"].count_documents({"status": "active"})
+        await college_db["meta"].update_one(
+            {}, {"$set": {"active_groups": active_groups, "last_updated": current_time}}, upsert=True
+        )
     elif update_type == "event":
-        updates["upcoming_events"] = await college_db["events"].count_documents({
-            "eventDate": {"$gte": current_time}
-        })
-    
-    updates["last_updated"] = current_time
-    
-    await college_db["meta"].update_one({}, {"$set": updates})
+        upcoming_events = await college_db["events"].count_documents({"eventDate": {"$gte": current_time}})
+        await college_db["meta"].update_one(
+            {}, {"$set": {"upcoming_events": upcoming_events, "last_updated": current_time}}, upsert=True
+        )
+
+def growth_percent(current: float, previous: float) -> float:
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 0
+
+async def college_meta_growth(college_db) -> dict:
+    """Month-to-date figures and month-over-month growth from the two latest month buckets."""
+    current_month = bucket_start(get_current_time(), "month")
+    previous_month = bucket_start(current_month - timedelta(days=1), "month")
+    values = {}
+    ids = [
+        rollup_id(metric, "month", month)
+        for metric in ("achievements", "donations")
+        for month in (current_month, previous_month)
+    ]
+    async for bucket in college_db["rollups"].find({"_id": {"$in": ids}}, {"value": 1}):
+        values[bucket["_id"]] = bucket["value"]
+
+    def month_value(metric, month):
+        return values.get(rollup_id(metric, "month", month), 0)
+
+    return {
+        "recent_achievements": month_value("achievements", current_month),
+        "recent_donations": month_value("donations", current_month),
+        "achievements_growth_percent": growth_percent(
+            month_value("achievements", current_month), month_value("achievements", previous_month)
+        ),
+        "donations_growth_percent": growth_percent(
+            month_value("donations", current_month), month_value("donations", previous_month)
+        ),
+    }
+
+async def recompute_college_meta(college_db) -> dict:
+    """Rebuild meta totals and rollup buckets from the source collections to repair drift."""
+    current_time = get_current_time()
+    (
+        total_students, total_alumni, total_achievements, donation_totals,
+        active_groups, upcoming_events,
+    ) = await asyncio.gather(
+        college_db["Student"].count_documents({}),
+        college_db["Alumni"].count_documents({}),
+        college_db["achievements"].count_documents({}),
+        college_db["donations"].aggregate([{"$group": {"_id": None, "total": {"$sum": "$amount"}}}]).to_list(length=1),
+        college_db["groups"].count_documents({"status": "active"}),
+        college_db["events"].count_documents({"eventDate": {"$gte": current_time}}),
+    )
+    # active_users has no source of truth to rebuild from and is left as is
+    await asyncio.gather(
+        rebuild_rollups(college_db, "students", "Student", "createdAt", 1),
+        rebuild_rollups(college_db, "alumni", "Alumni", "createdAt", 1),
+        rebuild_rollups(college_db, "achievements", "achievements", "createdAt", 1),
+        rebuild_rollups(college_db, "donations", "donations", "createdAt", "$amount"),
+        rebuild_rollups(college_db, "messages", "messages", "timestamp", 1),
+    )
+
+    totals = {
+        "total_students": total_students,
+        "total_alumni": total_alumni,
+        "total_achievements": total_achievements,
+        "total_donations": donation_totals[0]["total"] if donation_totals else 0,
+        "active_groups": active_groups,
+        "upcoming_events": upcoming_events,
+        "last_updated": current_time,
+    }
+    await college_db["meta"].update_one({}, {"$set": totals}, upsert=True)
+    return totals
 
 
 class SuperAdminLoginSchema(BaseModel):
@@ -606,7 +2623,7 @@ async def superadmin_login(credentials: SuperAdminLoginSchema, response: Respons
     superadmin = await db["SuperAdmin"].find_one({"username": credentials.username})
     if not superadmin:
         raise HTTPException(status_code=400, detail="Superadmin not found")
-    if not verify_password(credentials.password, superadmin["password"]):
+    if not await verify_password_async(credentials.password, superadmin["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     # Prepare user info for token
@@ -643,12 +2660,11 @@ async def superadmin_login(credentials: SuperAdminLoginSchema, response: Respons
 
 @app.post("/register")
 async def register(user: UserCreate, collegeId: str):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": collegeId})
+    college = await tenant_registry.get(collegeId)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
-    college_db = client[college["databaseName"]]
+    college_db = college["db"]
     role = user.role
     if role not in ["Student", "Alumni", "Admin"]:
         raise HTTPException(status_code=400, detail="Invalid role specified")
@@ -667,7 +2683,7 @@ async def register(user: UserCreate, collegeId: str):
         user_schema = AdminSchema(**user_dict)
 
     user_dict = user_schema.dict()
-    user_dict["password"] = get_password_hash(user.password)
+    user_dict["password"] = await get_password_hash_async(user.password)
     user_dict["lastSeen"] = get_current_time()
 
     result = await college_db[role].insert_one(user_dict)
@@ -677,25 +2693,25 @@ async def register(user: UserCreate, collegeId: str):
         await update_college_meta(college_db, "student")
     elif role == "Alumni":
         await update_college_meta(college_db, "alumni")
+        await skill_recommender.update_profile(collegeId, result.inserted_id, user_dict)
     
-    new_user = await college_db[role].find_one({"_id": result.inserted_id})
-    new_user["_id"] = str(new_user["_id"])
-    del new_user["password"]
-    return new_user
+    return FastJSONResponse(serialize_user(user_dict))
 
 @app.get("/users/me")
 async def read_users_me(current_user: dict = Depends(get_current_user)):
-    current_user["_id"] = str(current_user["_id"])
-    del current_user["collegeDb"]
-    return current_user
+    # The principal cache holds a slim projection; the profile page needs the full document
+    college_db = current_user["collegeDb"]
+    user = await college_db[current_user["role"]].find_one({"_id": current_user["_id"]}, {"password": 0})
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user["_id"] = str(user["_id"])
+    return user
 
 @app.post("/users/me/skills")
 async def update_skill(current_user: dict = Depends(get_current_user), skill: dict = Body(...), _: str = Depends(verify_csrf)):
     # skill: {"skill": "new_skill"}
     print(skill)
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     new_skill = skill.get("skill")
     if not new_skill or not isinstance(new_skill, str):
         raise HTTPException(status_code=400, detail="Invalid skill data")
@@ -714,6 +2730,14 @@ async def update_skill(current_user: dict = Depends(get_current_user), skill: di
         {"email": current_user["email"]},
         {"$addToSet": {"skills": new_skill}}
     )
+    await principal_cache.evict(current_user["collegeId"], current_user["role"], current_user["email"])
+    skills = list(current_user.get("skills") or [])
+    if new_skill not in skills:
+        skills.append(new_skill)
+    if current_user["role"] == "Alumni":
+        await skill_recommender.update_profile(current_user["collegeId"], current_user["_id"], {**current_user, "skills": skills})
+    else:
+        await skill_recommender.invalidate_user(current_user["collegeId"], current_user["_id"])
     print(result)
     return {"message": "Skill added successfully"}
 
@@ -721,9 +2745,7 @@ async def update_skill(current_user: dict = Depends(get_current_user), skill: di
 @app.put("/users/me")
 async def update_user_profile(current_user: dict = Depends(get_current_user), profile_data: dict = Body(...), _: str = Depends(verify_csrf)):
     # Update user profile information
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     
     # Determine user collection based on role
     if current_user["role"] == "Student":
@@ -757,12 +2779,17 @@ async def update_user_profile(current_user: dict = Depends(get_current_user), pr
         {"email": current_user["email"]},
         {"$set": update_data}
     )
+    await principal_cache.evict(current_user["collegeId"], current_user["role"], current_user["email"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="Profile update failed")
     
     # Fetch and return the updated user document
     updated_user = await user_collection.find_one({"email": current_user["email"]})
+    if current_user["role"] == "Alumni":
+        await skill_recommender.update_profile(current_user["collegeId"], updated_user["_id"], updated_user)
+    else:
+        await skill_recommender.invalidate_user(current_user["collegeId"], updated_user["_id"])
     updated_user["_id"] = str(updated_user["_id"])
     if "password" in updated_user:
         del updated_user["password"]
@@ -772,9 +2799,7 @@ async def update_user_profile(current_user: dict = Depends(get_current_user), pr
 @app.post("/users/me/experience")
 async def update_experience(current_user: dict = Depends(get_current_user), experience: dict = Body(...), _: str = Depends(verify_csrf)):
     # Handle both direct experience object and wrapped experience object
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     
     # Check if the experience is wrapped in an 'experience' field or sent directly
     new_experience = experience.get("experience") if "experience" in experience else experience
@@ -795,6 +2820,7 @@ async def update_experience(current_user: dict = Depends(get_current_user), expe
         {"email": current_user["email"]},
         {"$addToSet": {update_field: new_experience}}
     )
+    await principal_cache.evict(current_user["collegeId"], current_user["role"], current_user["email"])
     
     # Return the experience data that was added
     return new_experience
@@ -831,16 +2857,24 @@ async def get_user_profile(user_id: str, current_user: dict = Depends(get_curren
 @app.get("/users/")
 async def read_users(skip: int = 0, limit: int = 100, current_user: dict = Depends(get_current_user)):
     college_db = current_user["collegeDb"]
-    users = []
-    for role in ["Student", "Alumni", "Admin"]:
-        async for user in college_db[role].find().skip(skip).limit(limit):
-            user["_id"] = str(user["_id"])
-            del user["password"]
-            users.append(user)
-    return users
+    pages = await asyncio.gather(*(
+        college_db[role].find({}, {"password": 0}).skip(skip).limit(limit).to_list(length=limit)
+        for role in ["Student", "Alumni", "Admin"]
+    ))
+    return FastJSONResponse([user for page in pages for user in page])
+
+MESSAGE_MAX_CHARS = int(os.getenv("MESSAGE_MAX_CHARS", "10000"))
+
+def check_message_content(content):
+    """Reject message bodies that are not text or are longer than MESSAGE_MAX_CHARS."""
+    if not isinstance(content, str):
+        raise HTTPException(status_code=400, detail="Message content must be text")
+    if len(content) > MESSAGE_MAX_CHARS:
+        raise HTTPException(status_code=413, detail=f"Message content exceeds {MESSAGE_MAX_CHARS} characters")
 
 @app.post("/messages/")
 async def create_message(message: MessageCreate, current_user: dict = Depends(get_current_user)):
+    check_message_content(message.content)
     college_db = current_user["collegeDb"]
     message_dict = message.dict()
     message_dict["senderId"] = ObjectId(current_user["_id"])
@@ -854,61 +2888,113 @@ async def create_message(message: MessageCreate, current_user: dict = Depends(ge
         group = await college_db.groups.find_one({"_id": message_dict["groupId"]})
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
-    message_dict["timestamp"] = get_current_time()
+    message_dict["timestamp"] = get_message_time()
     message_dict["isRead"] = False
 
-    result = await college_db.messages.insert_one(message_dict)
-    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-    new_message["_id"] = str(new_message["_id"])
-    new_message["senderId"] = str(new_message["senderId"])
-    if new_message.get("receiverId"):
-        new_message["receiverId"] = str(new_message["receiverId"])
-    if new_message.get("groupId"):
-        new_message["groupId"] = str(new_message["groupId"])
-    return new_message
+    await message_store.save(college_db, message_dict)
+    rollup_recorder.record(college_db, "messages", 1, message_dict["timestamp"])
+    conversation_store.record(college_db, current_user["collegeId"], message_dict)
+    return FastJSONResponse(serialize_message(message_dict))
+
+# Message history and the inbox are paged by an opaque (timestamp, _id) cursor
+# rather than skip, so every page is a bounded range scan on a compound index.
+# Pages are always returned newest first; X-Next-Cursor pages towards older
+# entries and X-Prev-Cursor towards newer ones.
+MESSAGES_PAGE_MAX = int(os.getenv("MESSAGES_PAGE_MAX", "500"))
+
+def keyset_page_query(branches: List[dict], before: Optional[str], after: Optional[str], field: str = "timestamp"):
+    """Return (query, sort direction) for one page of the given $or branches."""
+    direction = DESCENDING
+    tie = None
+    if before or after:
+        timestamp, document_id = decode_cursor(before or after)
+        if before:
+            bound = {"$lte": timestamp}
+            tie = {field: timestamp, "_id": {"$gte": document_id}}
+        else:
+            bound = {"$gte": timestamp}
+            tie = {field: timestamp, "_id": {"$lte": document_id}}
+            direction = ASCENDING
+        # The range goes into every branch so each one stays an index range scan
+        branches = [{**branch, field: bound} for branch in branches]
+    query = branches[0] if len(branches) == 1 else {"$or": branches}
+    if tie:
+        query["$nor"] = [tie]
+    return query, direction
 
 @app.get("/messages/")
 async def read_messages(
     receiver_id: Optional[str] = None,
     group_id: Optional[str] = None,
-    skip: int = 0,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     limit: int = 100,
     current_user: dict = Depends(get_current_user)
 ):
     college_db = current_user["collegeDb"]
-    
-    query = {}
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    for value in (receiver_id, group_id):
+        if value and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+    limit = max(1, min(limit, MESSAGES_PAGE_MAX))
+    user_id = ObjectId(current_user["_id"])
+
     if receiver_id:
-        query["$or"] = [
-            {"senderId": ObjectId(current_user["_id"]), "receiverId": ObjectId(receiver_id)},
-            {"senderId": ObjectId(receiver_id), "receiverId": ObjectId(current_user["_id"])}
+        branches = [
+            {"senderId": user_id, "receiverId": ObjectId(receiver_id)},
+            {"senderId": ObjectId(receiver_id), "receiverId": user_id}
         ]
-        
     elif group_id:
-        query["groupId"] = ObjectId(group_id)
-        print(ObjectId(group_id))
-        count = await college_db["messages"].find_one({'groupId': ObjectId('67e80be166b4381a3ba6812c')})
-        print(f"Messages found: {count}")
-        print(query)
+        branches = [{"groupId": ObjectId(group_id)}]
     else:
-        query["$or"] = [
-            {"receiverId": ObjectId(current_user["_id"])},
-            {"senderId": ObjectId(current_user["_id"])}
-        ]
-    cursor = college_db["messages"].find(query).sort("timestamp", -1).skip(skip).limit(limit)
-    messages = await cursor.to_list(length=None)
-    
-    messages = []
-    async for message in college_db["messages"].find(query).sort("timestamp", -1).skip(skip).limit(limit):
-        message["_id"] = str(message["_id"])
-        message["senderId"] = str(message["senderId"])
-        if message.get("receiverId"):
-            message["receiverId"] = str(message["receiverId"])
-        if message.get("groupId"):
-            message["groupId"] = str(message["groupId"])
-        messages.append(message)
-        
-    return messages
+        branches = [{"receiverId": user_id}, {"senderId": user_id}]
+
+    query, direction = keyset_page_query(branches, before, after)
+    # One extra document tells us whether another page exists
+    cursor = college_db["messages"].find(query).sort([("timestamp", direction), ("_id", direction)]).limit(limit + 1)
+    page = await cursor.to_list(length=limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    if direction == ASCENDING:
+        page.reverse()
+
+    # Set on the returned response itself; FastAPI drops injected Response headers when a Response is returned
+    headers = {}
+    if page:
+        headers["X-Prev-Cursor"] = encode_cursor(page[0]["timestamp"], page[0]["_id"])
+        if (has_more and direction == DESCENDING) or after:
+            headers["X-Next-Cursor"] = encode_cursor(page[-1]["timestamp"], page[-1]["_id"])
+    for message in page:
+        message["cursor"] = encode_cursor(message["timestamp"], message["_id"])
+    return FastJSONResponse(page, headers=headers)
+
+@app.get("/conversations/")
+async def read_conversations(
+    before: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """The current user's inbox, most recently active conversation first."""
+    college_db = current_user["collegeDb"]
+    limit = max(1, min(limit, MESSAGES_PAGE_MAX))
+    query, direction = keyset_page_query([{"userId": ObjectId(current_user["_id"])}], before, None, field="lastMessageAt")
+    cursor = college_db.userchats.find(query).sort([("lastMessageAt", direction), ("_id", direction)]).limit(limit + 1)
+    page = await cursor.to_list(length=limit + 1)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(page[-1]["lastMessageAt"], page[-1]["_id"])
+    return FastJSONResponse(page, headers=headers)
+
+@app.post("/messages/read")
+async def mark_messages_read(receipt: ReadReceipt, current_user: dict = Depends(get_current_user)):
+    kind, conversation_id = read_receipt_target(receipt.peerId, receipt.groupId)
+    updated = await read_receipts.mark_read(
+        current_user["collegeDb"], current_user["collegeId"], str(current_user["_id"]),
+        kind, conversation_id, decode_cursor(receipt.upTo)
+    )
+    return {"status": "success", "updated": updated}
 
 @app.post("/groups/")
 async def create_group(group: GroupCreate, current_user: dict = Depends(get_current_user)):
@@ -925,26 +3011,16 @@ async def create_group(group: GroupCreate, current_user: dict = Depends(get_curr
     group_dict["members"] = [ObjectId(current_user["_id"])] + [ObjectId(m) for m in group_dict["members"]]
 
     result = await college_db.groups.insert_one(group_dict)
-    new_group = await college_db.groups.find_one({"_id": result.inserted_id})
-    new_group["_id"] = str(new_group["_id"])
-    new_group["createdBy"] = str(new_group["createdBy"])
-    new_group["admins"] = [str(a) for a in new_group["admins"]]
-    new_group["members"] = [str(m) for m in new_group["members"]]
-    return new_group
+    group_members_cache.set_members(current_user["collegeId"], str(result.inserted_id), group_dict["members"])
+    return FastJSONResponse(group_dict)
 
 @app.get("/groups/")
 async def read_groups(skip: int = 0, limit: int = 100, current_user: dict = Depends(get_current_user)):
     college_db = current_user["collegeDb"]
-    groups = []
-    async for group in college_db.groups.find({
+    groups = await college_db.groups.find({
         "members": ObjectId(current_user["_id"])
-    }).skip(skip).limit(limit):
-        group["_id"] = str(group["_id"])
-        group["createdBy"] = str(group["createdBy"])
-        group["admins"] = [str(a) for a in group["admins"]]
-        group["members"] = [str(m) for m in group["members"]]
-        groups.append(group)
-    return groups
+    }).skip(skip).limit(limit).to_list(length=limit)
+    return FastJSONResponse(groups)
 
 @app.get("/groups/{group_id}")
 async def read_group(group_id: str, current_user: dict = Depends(get_current_user)):
@@ -956,11 +3032,7 @@ async def read_group(group_id: str, current_user: dict = Depends(get_current_use
     if not group:
         raise HTTPException(status_code=404, detail="Group not found or access denied")
 
-    group["_id"] = str(group["_id"])
-    group["createdBy"] = str(group["createdBy"])
-    group["admins"] = [str(a) for a in group["admins"]]
-    group["members"] = [str(m) for m in group["members"]]
-    return group
+    return FastJSONResponse(group)
 
 @app.post("/groups/{group_id}/members")
 async def add_group_member(group_id: str, member_id: str, current_user: dict = Depends(get_current_user)):
@@ -976,10 +3048,15 @@ async def add_group_member(group_id: str, member_id: str, current_user: dict = D
         {"_id": ObjectId(group_id)},
         {"$addToSet": {"members": ObjectId(member_id)}}
     )
+    group_members_cache.add_member(current_user["collegeId"], group_id, member_id)
+    # Other workers drop their copy and reload it on next use
+    await message_bus.publish({"kind": "group_members", "college": current_user["collegeId"], "group": group_id})
     return {"status": "success", "message": "Member added to group"}
     
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
+    connection = None
+    receipts = None
     try:
         # Extract token from cookies
         cookies = websocket.cookies
@@ -997,65 +3074,83 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             return
 
         # Get the college database
-        SaaS_Management = client["SaaS_Management"]
-        college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+        college = await tenant_registry.get(college_id)
         if not college:
             await websocket.close(code=1008)
             return
         
-        college_db = client[college["databaseName"]]
+        college_db = college["db"]
+
+        # The path names the user, but only the token proves who is connecting:
+        # history replay and read receipts act on behalf of that user
+        role = payload.get("role")
+        if role not in ("Student", "Alumni", "Admin") or not ObjectId.is_valid(user_id):
+            await websocket.close(code=1008, reason="Invalid user")
+            return
+        principal = await principal_cache.get(college_id, role, email, college_db)
+        if principal is None or str(principal["_id"]) != user_id:
+            await websocket.close(code=1008, reason="Token does not match this user")
+            return
         
-        await manager.connect(websocket, user_id, college_id)
+        connection = await manager.connect(websocket, user_id, college_id)
+        if connection is None:
+            return
+        receipts = ReadReceiptBuffer(college_db, college_id, user_id)
+        await presence.connected(college_db, college_id, user_id, role)
         try:
             while True:
-                data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = await receive_frame(websocket)
+                connection.last_active = time.monotonic()
                 
                 # Handle different message types
-                if message_data["type"] == "message":
+                if message_data["type"] == "ping":
+                    connection.heartbeats = True
+                    connection.send(encode_frame({"type": "pong"}))
+
+                elif message_data["type"] == "resume":
+                    try:
+                        await replay_missed_messages(connection, college_db, message_data.get("cursor", ""))
+                    except HTTPException as e:
+                        connection.send(encode_frame({"type": "error", "detail": e.detail}))
+
+                elif message_data["type"] == "message":
+                    try:
+                        check_message_content(message_data.get("content"))
+                    except HTTPException as e:
+                        connection.send(encode_frame({"type": "error", "detail": e.detail}))
+                        continue
+
                     # Save to database
                     message = {
                         "content": message_data["content"],
                         "senderId": ObjectId(user_id),
                         "receiverId": ObjectId(message_data["receiverId"]),
-                        "timestamp": get_current_time(),
+                        "timestamp": get_message_time(),
                         "isRead": False
                     }
-                    result = await college_db.messages.insert_one(message)
-                    
-                    # Get the inserted message with string IDs for sending
-                    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-                    print(new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat())
-                    message_to_send = {
-                        "_id": str(new_message["_id"]),
-                        "content": new_message["content"],
-                        "senderId": str(new_message["senderId"]),
-                        "receiverId": str(new_message["receiverId"]),
-                        "timestamp": new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat(),
-                        "isRead": new_message["isRead"]
-                    }
+                    await message_store.save(college_db, message)
+                    rollup_recorder.record(college_db, "messages", 1, message["timestamp"])
+                    conversation_store.record(college_db, college_id, message)
+
+                    # save() assigned the _id, so the frame is built from the document we already have
+                    frame = encode_frame({
+                        "type": "message",
+                        "data": serialize_ws_message(message)
+                    })
                     
                     # Broadcast to receiver
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "message",
-                            "data": message_to_send
-                        }),
-                        message_data["receiverId"],
-                        college_id
-                    )
+                    await manager.send_personal_message(frame, message_data["receiverId"], college_id)
                     
                     # Also send back to sender for UI update
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "message",
-                            "data": message_to_send
-                        }),
-                        user_id,
-                        college_id
-                    )
+                    await manager.send_personal_message(frame, user_id, college_id)
 
                 elif message_data["type"] == "group_message":
+                    try:
+                        check_message_content(message_data.get("content"))
+                    except HTTPException as e:
+                        connection.send(encode_frame({"type": "error", "detail": e.detail}))
+                        continue
+
                     # Verify senderName matches JWT payload (optional security check)
                     if message_data.get("senderName") != payload.get("name"):
                         message_data["senderName"] = payload.get("name")  # Override with verified name
@@ -1065,27 +3160,20 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         "content": message_data["content"],
                         "senderId": ObjectId(user_id),
                         "groupId": ObjectId(message_data["groupId"]),
-                        "timestamp": get_current_time(),
+                        "timestamp": get_message_time(),
                         "isRead": False
                     }
-                    result = await college_db.messages.insert_one(message)
-
-                    # Get the inserted message with string IDs for sending
-                    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-                    print(new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat())
-                    message_to_send = {
-                        "_id": str(new_message["_id"]),
-                        "content": new_message["content"],
-                        "senderId": str(new_message["senderId"]),
-                        "groupId": str(new_message["groupId"]),
-                        "senderName": message_data.get("senderName", "Unknown"),
-                        "timestamp": new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat(),
-                        "isRead": new_message["isRead"]
-                    }
+                    await message_store.save(college_db, message)
+                    rollup_recorder.record(college_db, "messages", 1, message["timestamp"])
+                    conversation_store.record(college_db, college_id, message)
+
+                    message_to_send = serialize_ws_message(
+                        message, senderName=message_data.get("senderName", "Unknown")
+                    )
 
                     # Broadcast to group members
                     await manager.broadcast_to_group(
-                        json.dumps({
+                        encode_frame({
                             "type": "group_message",
                             "data": message_to_send
                         }),
@@ -1094,35 +3182,27 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         college_db
                     )
 
+                elif message_data["type"] == "read":
+                    try:
+                        kind, conversation_id = read_receipt_target(message_data.get("peerId"), message_data.get("groupId"))
+                        receipts.add(kind, conversation_id, decode_cursor(message_data.get("upTo", "")))
+                    except HTTPException as e:
+                        connection.send(encode_frame({"type": "error", "detail": e.detail}))
+
         except WebSocketDisconnect:
-            manager.disconnect(user_id, college_id)
-            # Update user status to offline
-            role = payload.get("role")
-            if role:
-                await college_db[role].update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"status": "offline", "lastSeen": get_current_time()}}
-                )
-                
-                # Notify others about user going offline
-                for connection_key in list(manager.active_connections.keys()):
-                    if connection_key.startswith(f"{college_id}:") and not connection_key.endswith(f":{user_id}"):
-                        try:
-                            await manager.active_connections[connection_key].send_text(
-                                json.dumps({
-                                    "type": "user_offline",
-                                    "userId": user_id
-                                })
-                            )
-                        except Exception as e:
-                            print(f"Error notifying about offline status: {e}")
+            await receipts.close()
+            # Other tabs/devices of this user may still be connected
+            presence.disconnected(college_id, user_id, manager.disconnect(connection))
                             
     except JWTError:
         await websocket.close(code=1008)
     except Exception as e:
         print(f"WebSocket error: {e}")
         try:
-            manager.disconnect(user_id, college_id)
+            if connection is not None:
+                presence.disconnected(college_id, user_id, manager.disconnect(connection))
+            if receipts is not None:
+                await receipts.close()
             await websocket.close(code=1011)
         except:
             pass
@@ -1147,6 +3227,144 @@ async def get_colleges(status: str = None, search: str = None, skip: int = 0, li
         colleges.append(college)
     return {"colleges": colleges}
     
+# Index catalogue
+# Declarative list of the indexes every tenant database (and SaaS_Management)
+# should have. The reconciler compares it with list_indexes and creates what is
+# missing: for every approved college at startup and for a college on approval.
+TENANT_INDEXES = {
+    "Student": [IndexModel([("email", ASCENDING)])],
+    "Alumni": [
+        IndexModel([("email", ASCENDING)]),
+        # Directory search: one text index over the searchable profile fields, plus
+        # keyset orderings for browsing with and without a department/year filter
+        IndexModel(
+            [("name", TEXT), ("skills", TEXT), ("department", TEXT), ("currentRole", TEXT),
+             ("professionalExperience.company", TEXT)],
+            weights={"name": 10, "skills": 5, "currentRole": 3, "professionalExperience.company": 3, "department": 2},
+            default_language="none",
+            name="directory_text",
+        ),
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("department", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("gradYear", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "Admin": [IndexModel([("email", ASCENDING)]), IndexModel([("name", ASCENDING)])],
+    "messages": [
+        IndexModel([("senderId", ASCENDING), ("receiverId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("senderId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("receiverId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("groupId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        # Only unread direct messages, which is all that marking read has to visit
+        IndexModel([("receiverId", ASCENDING), ("senderId", ASCENDING), ("timestamp", DESCENDING)],
+                   partialFilterExpression={"isRead": False}),
+    ],
+    "groups": [IndexModel([("members", ASCENDING)])],
+    "presence": [IndexModel([("workers.id", ASCENDING)])],
+    "userchats": [
+        IndexModel([("userId", ASCENDING), ("conversationId", ASCENDING)], unique=True),
+        IndexModel([("userId", ASCENDING), ("lastMessageAt", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "achievements": [IndexModel([("createdAt", DESCENDING)])],
+    "donations": [IndexModel([("createdAt", DESCENDING)])],
+    "events": [IndexModel([("eventDate", ASCENDING)])],
+    "rollups": [IndexModel([("metric", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING)])],
+    "rollup_members": [IndexModel([("start", ASCENDING)], expireAfterSeconds=ROLLUP_MEMBERS_TTL_SECONDS)],
+}
+
+MANAGEMENT_INDEXES = {
+    "colleges": [
+        IndexModel([("collegeId", ASCENDING)]),
+        IndexModel([("collegeName", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+    ],
+    "SuperAdmin": [IndexModel([("username", ASCENDING)])],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("heartbeatAt", ASCENDING)]),
+        IndexModel([("finishedAt", ASCENDING)]),
+    ],
+}
+
+RECONCILE_INDEXES_ON_STARTUP = os.getenv("RECONCILE_INDEXES_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+INDEX_RECONCILE_CONCURRENCY = int(os.getenv("INDEX_RECONCILE_CONCURRENCY", "8"))
+
+def _index_key(key) -> tuple:
+    # The server may hand back 1/-1 as floats or Int64
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in key.items())
+
+async def reconcile_indexes(db, catalogue: dict, create: bool = True) -> dict:
+    """Return {collection: [names of catalogue indexes that were missing]}, creating them unless create=False."""
+    async def reconcile_collection(collection, models):
+        existing = set()
+        async for index in db[collection].list_indexes():
+            # Text indexes come back keyed by _fts/_ftsx, so they are matched by name
+            existing.add(index["name"] if "_fts" in index["key"] else _index_key(index["key"]))
+        missing = [
+            model for model in models
+            if (model.document["name"] if TEXT in model.document["key"].values() else _index_key(model.document["key"])) not in existing
+        ]
+        if missing and create:
+            await db[collection].create_indexes(missing)
+        return collection, [model.document["name"] for model in missing]
+
+    results = await asyncio.gather(*(reconcile_collection(c, m) for c, m in catalogue.items()))
+    return {collection: names for collection, names in results if names}
+
+class IndexReconciler:
+    def __init__(self, concurrency: int = INDEX_RECONCILE_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.report: dict = {}   # collegeId (or "SaaS_Management") -> {collection: [missing index names]}
+        self.errors: dict = {}
+        self.last_run: Optional[datetime] = None
+
+    async def reconcile_tenant(self, college_id: str, database_name: str, create: bool = True) -> dict:
+        async with self._semaphore:
+            try:
+                missing = await reconcile_indexes(client[database_name], TENANT_INDEXES, create)
+            except Exception as e:
+                print(f"Error reconciling indexes for {college_id}: {e}")
+                self.errors[college_id] = str(e)
+                return {}
+        self.errors.pop(college_id, None)
+        if missing:
+            print(f"{'Created' if create else 'Missing'} indexes for {college_id}: {missing}")
+            self.report[college_id] = missing
+        else:
+            self.report.pop(college_id, None)
+        return missing
+
+    async def reconcile_all(self, create: bool = True, college_ids: Optional[List[str]] = None) -> dict:
+        """Reconcile SaaS_Management and every approved college concurrently."""
+        missing = await reconcile_indexes(client["SaaS_Management"], MANAGEMENT_INDEXES, create)
+        self.report["SaaS_Management"] = missing
+        query = {"status": "approved"}
+        if college_ids:
+            query["collegeId"] = {"$in": college_ids}
+        colleges = await client["SaaS_Management"].colleges.find(
+            query, {"collegeId": 1, "databaseName": 1}
+        ).to_list(length=None)
+        await asyncio.gather(*(
+            self.reconcile_tenant(college["collegeId"], college["databaseName"], create)
+            for college in colleges
+        ))
+        self.last_run = get_current_time()
+        return {k: v for k, v in self.report.items() if v}
+
+    def stats(self) -> dict:
+        return {
+            "last_run": self.last_run,
+            "missing": {k: v for k, v in self.report.items() if v},
+            "errors": self.errors,
+        }
+
+index_reconciler = IndexReconciler()
+
+@app.on_event("startup")
+async def reconcile_indexes_on_startup():
+    if RECONCILE_INDEXES_ON_STARTUP:
+        # Don't hold up startup; the report is visible on /system/metrics
+        app.state.index_reconcile_task = asyncio.create_task(index_reconciler.reconcile_all())
+
 @app.post("/colleges/{college_id}/approve")
 async def approve_college(college_id: str, current_user: dict = Depends(get_current_user), _: str = Depends(verify_csrf)):
     if current_user["role"] != "Admin":
@@ -1163,6 +3381,7 @@ async def approve_college(college_id: str, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=400, detail="College has been rejected and cannot be approved.")
     # Update status to approved
     await SaaS_Management.colleges.update_one({"collegeId": college_id}, {"$set": {"status": "approved"}})
+    await tenant_registry.evict(college_id)
 
     try:
         collegedb = client[college["databaseName"]]
@@ -1174,9 +3393,7 @@ async def approve_college(college_id: str, current_user: dict = Depends(get_curr
                 print(f"Creating collection {coll} in {college['databaseName']}")
                 await collegedb.create_collection(coll)
 
-        await collegedb["messages"].create_index([("senderId", 1), ("receiverId", 1), ("timestamp", -1)])
-        await collegedb["messages"].create_index([("groupId", 1), ("timestamp", -1)])
-        await collegedb["groups"].create_index([("members", 1)])
+        await index_reconciler.reconcile_tenant(college_id, college["databaseName"])
         print(f"All collections created successfully for {college['databaseName']}")
     except Exception as e:
         print(f"Error creating collections: {e}")
@@ -1199,6 +3416,7 @@ async def reject_college(college_id: str, current_user: dict = Depends(get_curre
         raise HTTPException(status_code=400, detail="College has been approved and cannot be rejected.")
     # Update status to rejected
     await SaaS_Management.colleges.update_one({"collegeId": college_id}, {"$set": {"status": "rejected"}})
+    await tenant_registry.evict(college_id)
     return {"message": "College rejected successfully"}
 
 class CollegeLogin(BaseModel):
@@ -1214,22 +3432,18 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60  # or your desired value
 
 @app.post("/college-login")
 async def college_login(credentials: CollegeLogin):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": credentials.collegeId})
+    college = await tenant_registry.get(credentials.collegeId)
     
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
     
-    college_db = client[college["databaseName"]]
+    college_db = college["db"]
     admin = await college_db["Admin"].find_one({"name": credentials.collegeId})
     
-    if not admin or not verify_password(credentials.password, admin["password"]):
+    if not admin or not await verify_password_async(credentials.password, admin["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    await college_db["Admin"].update_one(
-        {"_id": admin["_id"]},
-        {"$set": {"lastSeen": get_current_time(), "status": "online"}}
-    )
+    presence.record_seen(college_db, "Admin", admin["_id"])
 
     # Create JWT payload
     user_info = {
@@ -1312,13 +3526,10 @@ async def add_admin(
     admin_dict["collegeId"] = college_id
     admin_dict["createdAt"] = get_current_time()
     admin_dict["collegeStatus"] = "approved"
-    admin_dict["password"] = get_password_hash(admin_dict["password"])
+    admin_dict["password"] = await get_password_hash_async(admin_dict["password"])
 
-    result = await college_db["Admin"].insert_one(admin_dict)
-    new_admin = await college_db["Admin"].find_one({"_id": result.inserted_id})
-    new_admin["_id"] = str(new_admin["_id"])
-    del new_admin["password"]
-    return {"status": "success", "admin": new_admin}
+    await college_db["Admin"].insert_one(admin_dict)
+    return FastJSONResponse({"status": "success", "admin": serialize_user(admin_dict)})
 
 
 @app.delete("/admins/{admin_id}")
@@ -1350,6 +3561,7 @@ async def remove_admin(
     result = await college_db["Admin"].delete_one({"_id": ObjectId(admin_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=500, detail="Failed to remove admin.")
+    await principal_cache.evict(current_user["collegeId"], "Admin", existing_admin["email"])
 
     return {"status": "success", "message": f"Admin with id {admin_id} removed."}
 
@@ -1374,6 +3586,7 @@ async def remove_students(
 
     object_ids = [ObjectId(sid) for sid in student_ids]
     result = await college_db["Student"].delete_many({"_id": {"$in": object_ids}})
+    await principal_cache.evict_ids(current_user["collegeId"], "Student", object_ids)
     return {
         "status": "success",
         "deleted_count": result.deleted_count,
@@ -1401,6 +3614,8 @@ async def remove_alumni(
 
     object_ids = [ObjectId(aid) for aid in alumni_ids]
     result = await college_db["Alumni"].delete_many({"_id": {"$in": object_ids}})
+    await principal_cache.evict_ids(current_user["collegeId"], "Alumni", object_ids)
+    await skill_recommender.remove(current_user["collegeId"], object_ids)
     return {
         "status": "success",
         "deleted_count": result.deleted_count,
@@ -1408,9 +3623,770 @@ async def remove_alumni(
     }
 
 
+# Bulk registration pipeline
+# Rows are processed a chunk at a time: vectorised cleanup/validation in pandas,
+# one $in query for existing emails, batched argon2 across the password pool and
+# a single unordered insert_many whose write errors are mapped back to rows.
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+BULK_IMPORT_SPECS = {
+    "Student": {"columns": ["rollno", "email"], "schema": StudentSchema, "name_column": "rollno"},
+    "Alumni": {"columns": ["name", "prn", "email"], "schema": AlumniSchema, "name_column": "name"},
+}
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+def normalize_bulk_chunk(df: pd.DataFrame, role: str) -> pd.DataFrame:
+    """Return the import columns as trimmed strings (emails lower-cased) plus an 'error' column."""
+    columns = BULK_IMPORT_SPECS[role]["columns"]
+    rows = pd.DataFrame(index=df.index)
+    for col in columns:
+        rows[col] = df[col].fillna("").astype(str).str.strip()
+    rows["email"] = rows["email"].str.lower()
+
+    error = pd.Series("", index=df.index, dtype=object)
+    error[~rows["email"].str.match(EMAIL_PATTERN)] = "Error: invalid email"
+    for col in columns:
+        if col != "email":
+            error[(rows[col] == "") & (error == "")] = f"Error: missing {col}"
+    error[rows["email"].duplicated() & (error == "")] = "Error: duplicate email in file"
+    rows["error"] = error
+    return rows
+
+async def register_bulk_chunk(college_db, college_id: str, role: str, df: pd.DataFrame):
+    """
+    Register one chunk of spreadsheet rows.
+    Returns (passwords, statuses, created_count) aligned with the chunk's rows.
+    """
+    spec = BULK_IMPORT_SPECS[role]
+    rows = normalize_bulk_chunk(df, role)
+    statuses = rows["error"].tolist()
+    passwords = [""] * len(rows)
+
+    candidates = rows.loc[rows["error"] == "", "email"].tolist()
+    existing = set()
+    if candidates:
+        async for doc in college_db[role].find({"email": {"$in": candidates}}, {"email": 1, "_id": 0}):
+            existing.add(doc["email"])
+
+    positions = []
+    for pos, (email, error) in enumerate(zip(rows["email"], statuses)):
+        if error:
+            continue
+        if email in existing:
+            statuses[pos] = "Already Exists"
+            continue
+        positions.append(pos)
+    if not positions:
+        return passwords, statuses, 0
+
+    plain = [str(random.randint(100000, 999999)) for _ in positions]
+    hashed = await hash_passwords_async(plain)
+
+    template = spec["schema"](
+        name="",
+        email="",
+        role=role,
+        collegeId=college_id,
+        status="offline",
+        lastSeen=None,
+        createdAt=get_current_time()
+    ).dict()
+    records = rows.to_dict("records")
+    documents = []
+    for pos, password_hash in zip(positions, hashed):
+        row = records[pos]
+        doc = copy.deepcopy(template)
+        for col in spec["columns"]:
+            doc[col] = row[col]
+        doc["name"] = row[spec["name_column"]]
+        doc["password"] = password_hash
+        documents.append(doc)
+
+    failed = {}
+    try:
+        await college_db[role].insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            if write_error.get("code") == 11000:
+                failed[write_error["index"]] = "Already Exists"
+            else:
+                failed[write_error["index"]] = f"Error: {write_error.get('errmsg', 'insert failed')}"
+
+    created_count = 0
+    for index, (pos, password) in enumerate(zip(positions, plain)):
+        if index in failed:
+            statuses[pos] = failed[index]
+        else:
+            passwords[pos] = password
+            statuses[pos] = "Created"
+            created_count += 1
+    return passwords, statuses, created_count
+
+# Streaming spreadsheet ingestion
+# Uploads are read straight from the spooled upload file a chunk at a time
+# (read-only openpyxl iteration or chunked CSV), so peak memory follows
+# BULK_CHUNK_SIZE rather than the size of the sheet.
+class SpreadsheetChunkReader:
+    """Iterate an .xlsx, .csv or .csv.gz upload as DataFrames of at most chunk_size rows."""
+
+    def __init__(self, fileobj, filename: str, chunk_size: int = BULK_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._workbook = None
+        name = (filename or "").lower()
+        if name.endswith(".csv") or name.endswith(".csv.gz"):
+            self._chunks = pd.read_csv(
+                fileobj,
+                chunksize=chunk_size,
+                dtype=str,
+                keep_default_na=False,
+                compression="gzip" if name.endswith(".gz") else None
+            )
+            # Read ahead one chunk so the header is known before any rows are processed
+            self._first = next(self._chunks, None)
+            self.columns = self._normalize_columns(self._first.columns if self._first is not None else [])
+        else:
+            self._workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+            self._rows = self._workbook.active.iter_rows(values_only=True)
+            header = next(self._rows, None) or ()
+            self.columns = self._normalize_columns(header)
+            self._chunks = self._xlsx_chunks()
+            self._first = None
+
+    @staticmethod
+    def _normalize_columns(columns):
+        return [str(col).strip().lower() if col is not None else "" for col in columns]
+
+    def _xlsx_chunks(self):
+        batch = []
+        for row in self._rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                yield pd.DataFrame(batch, columns=self.columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=self.columns)
+
+    def next_chunk(self):
+        if self._first is not None:
+            chunk, self._first = self._first, None
+        else:
+            chunk = next(self._chunks, None)
+        if chunk is not None:
+            chunk.columns = self.columns
+        return chunk
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Parsing is blocking work; keep it off the event loop
+        chunk = await asyncio.to_thread(self.next_chunk)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+
+async def open_bulk_upload(fileobj, filename: str, role: str) -> SpreadsheetChunkReader:
+    """Open an uploaded sheet and check its header; raises 400 before any row is touched."""
+    required = BULK_IMPORT_SPECS[role]["columns"]
+    try:
+        reader = await asyncio.to_thread(SpreadsheetChunkReader, fileobj, filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read uploaded file: {e}")
+    if not set(required).issubset(reader.columns):
+        reader.close()
+        columns = ", ".join(f"'{col}'" for col in required)
+        raise HTTPException(status_code=400, detail=f"File must have {columns} columns.")
+    return reader
+
+async def ingest_bulk_upload(reader: SpreadsheetChunkReader, college_db, college_id: str, role: str, writer, progress=None):
+    """
+    Stream an opened sheet through register_bulk_chunk, handing each result chunk
+    (original columns plus password/status) to writer. Returns created_count.
+    progress, if given, is awaited after every chunk with that chunk's statuses.
+    """
+    created_count = 0
+    try:
+        writer.write_header(reader.columns + ["password", "status"])
+        async for chunk in reader:
+            passwords, statuses, created = await register_bulk_chunk(college_db, college_id, role, chunk)
+            chunk["password"] = passwords
+            chunk["status"] = statuses
+            await asyncio.to_thread(writer.write_rows, chunk)
+            created_count += created
+            if progress:
+                await progress(statuses)
+    finally:
+        reader.close()
+    return created_count
+
+BULK_IMPORT_META_TYPES = {"Student": "student", "Alumni": "alumni"}
+
+# Result sheet writers
+# Result rows are written as each chunk finishes instead of being collected into
+# one DataFrame: the xlsx writer uses a write-only workbook (rows are flushed to
+# disk as they are appended), the CSV writer hands back bytes that can be sent
+# to the client straight away.
+RESULT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+def _result_row(values):
+    # openpyxl and csv both want None rather than NaN for blank cells
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+class XlsxResultWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+
+    def write_header(self, columns: List[str]):
+        self._sheet.append(columns)
+
+    def write_rows(self, df: pd.DataFrame):
+        for values in df.itertuples(index=False, name=None):
+            self._sheet.append(_result_row(values))
+
+    def close(self):
+        self._workbook.save(self.path)
+
+class CsvResultWriter:
+    def __init__(self, fileobj=None):
+        # Without a file the writer buffers until drain() is called
+        self._buffer = io.StringIO()
+        self._fileobj = fileobj
+        self._csv = csv.writer(self._buffer)
+
+    def write_header(self, columns: List[str]):
+        self._csv.writerow(columns)
+        self._flush()
+
+    def write_rows(self, df: pd.DataFrame):
+        self._csv.writerows(_result_row(values) for values in df.itertuples(index=False, name=None))
+        self._flush()
+
+    def _flush(self):
+        if self._fileobj is not None:
+            self._fileobj.write(self.drain())
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def close(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+
+def create_result_writer(result_format: str, path: str):
+    if result_format == "csv":
+        return CsvResultWriter(open(path, "wb"))
+    return XlsxResultWriter(path)
+
+# Background jobs
+# Bulk imports run as jobs on a bounded pool of worker tasks. Job state lives in
+# a pluggable JobStore; results and staged uploads live under JOBS_DIR. With
+# several workers a status poll can land on any of them, so the store defaults
+# to MongoDB there. Each worker heartbeats the jobs it owns; queued or running
+# jobs whose heartbeat is older than JOB_STALE_SECONDS belonged to a worker that
+# died and are marked failed, at startup and periodically after.
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join("data", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "20"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+
+def default_job_store() -> str:
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return "mongo" if workers > 1 or BUS_BACKEND == "unix" else "memory"
+
+JOB_STORE = os.getenv("JOB_STORE") or default_job_store()  # memory | file | mongo
+
+class JobStore(ABC):
+    """Interface for job state. Jobs are plain JSON-serialisable dicts keyed by "id"."""
+
+    @abstractmethod
+    async def create(self, job: dict):
+        ...
+
+    @abstractmethod
+    async def update(self, job_id: str, **fields):
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    async def list_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def finished_before(self, cutoff: str) -> List[dict]:
+        """Jobs whose finishedAt is older than cutoff (an ISO timestamp)."""
+        ...
+
+    async def fail_stale(self, cutoff: str, error: str, exclude_ids) -> List[str]:
+        """Fail queued/running jobs not in exclude_ids whose heartbeat is older than cutoff; returns their ids."""
+        failed = []
+        for job_id in await self.list_ids():
+            job = await self.get(job_id)
+            if not job or job["status"] not in ("queued", "running") or job_id in exclude_ids:
+                continue
+            if (job.get("heartbeatAt") or job["createdAt"]) < cutoff:
+                await self.update(job_id, status="failed", error=error, finishedAt=get_current_time().isoformat())
+                failed.append(job_id)
+        return failed
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: dict = {}
+
+    async def create(self, job: dict):
+        self._jobs[job["id"]] = dict(job)
+
+    async def update(self, job_id: str, **fields):
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def delete(self, job_id: str):
+        self._jobs.pop(job_id, None)
+
+    async def list_ids(self) -> List[str]:
+        return list(self._jobs)
+
+    async def finished_before(self, cutoff: str) -> List[dict]:
+        return [dict(job) for job in self._jobs.values() if job.get("finishedAt") and job["finishedAt"] < cutoff]
+
+class LocalFileJobStore(JobStore):
+    """One JSON file per job, so job state survives a restart on a single node."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._locks: dict = {}
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _read(self, job_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, job: dict):
+        tmp_path = self._path(job["id"]) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job["id"]))
+
+    async def create(self, job: dict):
+        await asyncio.to_thread(self._write, job)
+
+    async def update(self, job_id: str, **fields):
+        # Serialise read-modify-write per job within this process
+        lock = self._locks.setdefault(job_id, asyncio.Lock())
+        async with lock:
+            job = await asyncio.to_thread(self._read, job_id)
+            if job is not None:
+                job.update(fields)
+                await asyncio.to_thread(self._write, job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._read, job_id)
+
+    async def delete(self, job_id: str):
+        self._locks.pop(job_id, None)
+        try:
+            await asyncio.to_thread(os.remove, self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+    async def list_ids(self) -> List[str]:
+        names = await asyncio.to_thread(os.listdir, self.directory)
+        return [name[:-5] for name in names if name.endswith(".json")]
+
+    def _scan_finished(self, cutoff: str) -> List[dict]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                job = self._read(name[:-5])
+                if job and job.get("finishedAt") and job["finishedAt"] < cutoff:
+                    jobs.append(job)
+        return jobs
+
+    async def finished_before(self, cutoff: str) -> List[dict]:
+        # One pass over the directory in a single thread hop
+        return await asyncio.to_thread(self._scan_finished, cutoff)
+
+class MongoJobStore(JobStore):
+    """Jobs in SaaS_Management.jobs, shared by every worker."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create(self, job: dict):
+        await self.collection.insert_one({"_id": job["id"], **job})
+
+    async def update(self, job_id: str, **fields):
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": job_id}, {"_id": 0})
+
+    async def delete(self, job_id: str):
+        await self.collection.delete_one({"_id": job_id})
+
+    async def list_ids(self) -> List[str]:
+        return [doc["_id"] async for doc in self.collection.find({}, {"_id": 1})]
+
+    async def finished_before(self, cutoff: str) -> List[dict]:
+        return await self.collection.find({"finishedAt": {"$ne": None, "$lt": cutoff}}, {"_id": 0}).to_list(length=None)
+
+    async def fail_stale(self, cutoff: str, error: str, exclude_ids) -> List[str]:
+        query = {
+            "status": {"$in": ["queued", "running"]},
+            "_id": {"$nin": list(exclude_ids)},
+            "$or": [{"heartbeatAt": {"$lt": cutoff}}, {"heartbeatAt": None, "createdAt": {"$lt": cutoff}}],
+        }
+        job_ids = [doc["_id"] async for doc in self.collection.find(query, {"_id": 1})]
+        if job_ids:
+            # Re-check the condition so a job heartbeated in the meantime is left alone
+            await self.collection.update_many(
+                {**query, "_id": {"$in": job_ids}},
+                {"$set": {"status": "failed", "error": error, "finishedAt": get_current_time().isoformat()}}
+            )
+        return job_ids
+
+def create_job_store(kind: str = JOB_STORE) -> JobStore:
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "file":
+        return LocalFileJobStore(os.path.join(JOBS_DIR, "state"))
+    if kind == "mongo":
+        return MongoJobStore(client["SaaS_Management"].jobs)
+    raise ValueError(f"Unknown JOB_STORE {kind!r}")
+
+class JobRunner:
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, queue_max: int = JOB_QUEUE_MAX):
+        self.store = store
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_max = queue_max
+        self._tasks: List[asyncio.Task] = []
+        self._active: set = set()   # ids of this worker's queued and running jobs
+        self._monitor: Optional[asyncio.Task] = None
+        self.recovered = 0
+
+    def _ensure_started(self):
+        # Worker tasks need a running loop, so start them on first use
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_max)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, job: dict, run):
+        """
+        Queue run(job_id, progress) and return the stored job.
+        run returns a dict of extra fields to store on completion.
+        """
+        self._ensure_started()
+        if self._queue.full():
+            raise HTTPException(status_code=503, detail="Too many jobs queued, please retry later")
+        job = {
+            **job,
+            "status": "queued",
+            "rows_processed": 0,
+            "created": 0,
+            "duplicates": 0,
+            "errors": 0,
+            "error": None,
+            "createdAt": get_current_time().isoformat(),
+            "startedAt": None,
+            "finishedAt": None,
+            "worker": WORKER_ID,
+            "heartbeatAt": get_current_time().isoformat(),
+        }
+        await self.store.create(job)
+        self._active.add(job["id"])
+        self._queue.put_nowait((job["id"], run))
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id, run = await self._queue.get()
+            try:
+                await self._run(job_id, run)
+            except Exception as e:
+                # A store error must not end this worker; the job is no longer
+                # heartbeated, so recover_stale() fails it if it was left unfinished
+                print(f"Error running job {job_id}: {e}")
+            finally:
+                self._active.discard(job_id)
+                self._queue.task_done()
+            try:
+                await self.purge_expired()
+            except Exception as e:
+                print(f"Error purging expired jobs: {e}")
+
+    async def _run(self, job_id: str, run):
+        await self.store.update(job_id, status="running", startedAt=get_current_time().isoformat())
+        counts = {"rows_processed": 0, "created": 0, "duplicates": 0, "errors": 0}
+
+        async def progress(statuses: List[str]):
+            counts["rows_processed"] += len(statuses)
+            for row_status in statuses:
+                if row_status == "Created":
+                    counts["created"] += 1
+                elif row_status == "Already Exists":
+                    counts["duplicates"] += 1
+                else:
+                    counts["errors"] += 1
+            await self.store.update(job_id, **counts)
+
+        try:
+            extra = await run(job_id, progress) or {}
+            await self.store.update(job_id, status="completed", finishedAt=get_current_time().isoformat(), **extra)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"Job {job_id} failed: {detail}")
+            await self.store.update(job_id, status="failed", error=detail, finishedAt=get_current_time().isoformat())
+
+    async def purge_expired(self):
+        """Delete finished jobs (and their files) older than JOB_RETENTION_SECONDS."""
+        cutoff = (get_current_time() - timedelta(seconds=JOB_RETENTION_SECONDS)).isoformat()
+        for job in await self.store.finished_before(cutoff):
+            if job.get("result_path"):
+                try:
+                    os.remove(job["result_path"])
+                except FileNotFoundError:
+                    pass
+            await self.store.delete(job["id"])
+
+    async def start(self):
+        self._monitor = asyncio.create_task(self._heartbeat())
+        await self.recover_stale()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                now = get_current_time().isoformat()
+                for job_id in list(self._active):
+                    await self.store.update(job_id, heartbeatAt=now)
+                await self.recover_stale()
+            except Exception as e:
+                print(f"Error in job heartbeat: {e}")
+
+    async def recover_stale(self):
+        """Fail jobs left queued or running by a worker that stopped heartbeating."""
+        cutoff = (get_current_time() - timedelta(seconds=JOB_STALE_SECONDS)).isoformat()
+        job_ids = await self.store.fail_stale(cutoff, "Interrupted: the server running this job stopped", set(self._active))
+        for job_id in job_ids:
+            print(f"Job {job_id} was interrupted; marked failed")
+            await asyncio.to_thread(discard_job_files, job_id)
+        self.recovered += len(job_ids)
+
+    async def shutdown(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        # Taken first: cancelled workers drop their job from _active on the way out
+        interrupted = list(self._active)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        # Cancelled jobs would otherwise sit in "running" until another worker notices
+        for job_id in interrupted:
+            await self.store.update(job_id, status="failed", error="Interrupted by server shutdown",
+                                    finishedAt=get_current_time().isoformat())
+            await asyncio.to_thread(discard_job_files, job_id)
+        self._active.clear()
+
+def discard_job_files(job_id: str):
+    """Remove the staged upload and any partial result of a job that will never finish."""
+    for directory in ("uploads", "results"):
+        path = os.path.join(JOBS_DIR, directory)
+        if not os.path.isdir(path):
+            continue
+        for name in os.listdir(path):
+            if name.startswith(f"{job_id}-") or name.startswith(f"{job_id}."):
+                os.remove(os.path.join(path, name))
+
+job_runner = JobRunner(create_job_store())
+
+@app.on_event("startup")
+async def start_job_runner():
+    try:
+        await job_runner.start()
+    except Exception as e:
+        print(f"Error recovering interrupted jobs: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_job_runner():
+    await job_runner.shutdown()
+
+def stage_upload(fileobj, path: str):
+    """Copy an upload out of the request's temp file, which is closed when the request ends."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out)
+
+async def start_bulk_import(file: UploadFile, current_user: dict, role: str, wait: bool, result_format: str, result_stem: str):
+    if result_format not in RESULT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="result_format must be 'xlsx' or 'csv'")
+    college_db = current_user["collegeDb"]
+    college_id = current_user["collegeId"]
+    result_name = f"{result_stem}.{result_format}"
+
+    if wait:
+        # Synchronous mode: import inline and stream the result in this response
+        if result_format == "csv":
+            # The body is sent after this handler returns, by which point the
+            # request's upload file is closed; stream from a staged copy instead
+            filename = os.path.basename(file.filename or "upload.csv")
+            source_path = os.path.join(JOBS_DIR, "uploads", f"{uuid4().hex}-{filename}")
+            await asyncio.to_thread(stage_upload, file.file, source_path)
+            source = open(source_path, "rb")
+            try:
+                reader = await open_bulk_upload(source, filename, role)
+            except Exception:
+                source.close()
+                os.remove(source_path)
+                raise
+            return StreamingResponse(
+                stream_bulk_import_csv(reader, college_db, college_id, role, source_path, source),
+                media_type=RESULT_MEDIA_TYPES["csv"],
+                headers={"Content-Disposition": f"attachment; filename={result_name}"}
+            )
+        reader = await open_bulk_upload(file.file, file.filename, role)
+        # xlsx is a zip container and can't be emitted row by row; build it with a
+        # write-only workbook on disk and stream the file
+        result_path = os.path.join(JOBS_DIR, "results", f"{uuid4().hex}.xlsx")
+        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        writer = XlsxResultWriter(result_path)
+        try:
+            created_count = await ingest_bulk_upload(reader, college_db, college_id, role, writer)
+            await asyncio.to_thread(writer.close)
+        except Exception:
+            if os.path.exists(result_path):
+                os.remove(result_path)
+            raise
+        if created_count > 0:
+            await update_college_meta(college_db, BULK_IMPORT_META_TYPES[role], created_count)
+        return FileResponse(
+            result_path,
+            media_type=RESULT_MEDIA_TYPES["xlsx"],
+            filename=result_name,
+            background=BackgroundTask(os.remove, result_path)
+        )
+
+    job_id = uuid4().hex
+    # Keep the original suffix so the reader can tell csv/csv.gz/xlsx apart
+    filename = os.path.basename(file.filename or "upload.xlsx")
+    source_path = os.path.join(JOBS_DIR, "uploads", f"{job_id}-{filename}")
+    await asyncio.to_thread(stage_upload, file.file, source_path)
+
+    async def run(job_id: str, progress):
+        result_path = os.path.join(JOBS_DIR, "results", f"{job_id}.{result_format}")
+        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        try:
+            with open(source_path, "rb") as source:
+                reader = await open_bulk_upload(source, filename, role)
+                writer = create_result_writer(result_format, result_path)
+                try:
+                    created_count = await ingest_bulk_upload(reader, college_db, college_id, role, writer, progress)
+                finally:
+                    await asyncio.to_thread(writer.close)
+        finally:
+            os.remove(source_path)
+        if created_count > 0:
+            await update_college_meta(college_db, BULK_IMPORT_META_TYPES[role], created_count)
+        return {"result_path": result_path}
+
+    try:
+        job = await job_runner.submit({
+            "id": job_id,
+            "type": f"bulk_register_{role.lower()}",
+            "collegeId": college_id,
+            "createdBy": str(current_user["_id"]),
+            "resultName": result_name,
+            "resultFormat": result_format,
+            "result_path": None,
+        }, run)
+    except HTTPException:
+        os.remove(source_path)
+        raise
+    return {"job_id": job_id, "status": job["status"], "status_url": f"/jobs/{job_id}"}
+
+async def stream_bulk_import_csv(reader: SpreadsheetChunkReader, college_db, college_id: str, role: str,
+                                 source_path: Optional[str] = None, source=None):
+    """
+    Yield CSV result bytes chunk by chunk while the import runs.
+    source/source_path, if given, are the staged upload the reader is reading;
+    the generator owns them and closes and removes them when it finishes.
+    """
+    writer = CsvResultWriter()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+
+    async def flush(statuses):
+        await queue.put(writer.drain())
+
+    async def produce():
+        try:
+            created_count = await ingest_bulk_upload(reader, college_db, college_id, role, writer, flush)
+            if created_count > 0:
+                await update_college_meta(college_db, BULK_IMPORT_META_TYPES[role], created_count)
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            data = await queue.get()
+            if data is None:
+                break
+            yield data
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if source is not None:
+            source.close()
+        if source_path is not None and os.path.exists(source_path):
+            os.remove(source_path)
+
 @app.post("/bulk-register-students/")
 async def bulk_register_students(
     file: UploadFile = File(...),
+    wait: bool = False,
+    result_format: str = "xlsx",
     current_user: dict = Depends(get_current_user),
     _: str = Depends(verify_csrf)
 ):
@@ -1419,82 +4395,12 @@ async def bulk_register_students(
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Only college admins can bulk register students.")
     
-    SaaS_Management = client["SaaS_Management"]
     college_id = current_user["collegeId"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    college = await tenant_registry.get(college_id)
     
     if not college or college.get("status") != "approved":
         raise HTTPException(status_code=403, detail="College account is not approved yet")
-    college_db = current_user["collegeDb"]
-    
-    # Read the uploaded Excel file into a pandas DataFrame
-    contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents))
-
-    # Normalize column names
-    df.columns = [col.strip().lower() for col in df.columns]
-
-    # Check for required columns
-    if not {'rollno', 'email'}.issubset(df.columns):
-        raise HTTPException(status_code=400, detail="Excel must have 'rollno' and 'email' columns.")
-
-    # Prepare results for Excel output
-    passwords = []
-    statuses = []
-    
-    # Track number of successfully created students
-    created_count = 0
-
-    for idx, row in df.iterrows():
-        rollno = str(row['rollno']).strip()
-        email = str(row['email']).strip().lower()
-        password = str(random.randint(100000, 999999))
-
-        # Check if student already exists
-        existing = await college_db["Student"].find_one({"email": email})
-        if existing:
-            passwords.append("")
-            statuses.append("Already Exists")
-            continue
-
-        # Prepare student dict
-        student_obj = StudentSchema(
-            name=rollno,
-            email=email,
-            role="Student",
-            collegeId=college_id,
-            rollno=rollno,
-            status="offline",
-            lastSeen=None,
-            createdAt=get_current_time()
-        )
-        student_dict = student_obj.dict()
-        student_dict["password"] = get_password_hash(password)
-        await college_db["Student"].insert_one(student_dict)
-        passwords.append(password)
-        statuses.append("Created")
-        created_count += 1
-
-    # Add password and status columns to DataFrame
-    df['password'] = passwords
-    df['status'] = statuses
-    
-    # Update meta collection with the count of newly created students
-    if created_count > 0:
-        await update_college_meta(college_db, "student", created_count)
-
-    # Write the DataFrame to an Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-
-    # Return the file as a response
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=students_with_passwords.xlsx"}
-    )
+    return await start_bulk_import(file, current_user, "Student", wait, result_format, "students_with_passwords")
 
 @app.get("/students/", response_model=List[StudentSchema])
 async def get_all_students(current_user: User = Depends(get_current_user)):
@@ -1516,83 +4422,47 @@ async def get_all_students(current_user: User = Depends(get_current_user)):
 @app.post("/bulk-register-alumni/")
 async def bulk_register_alumni(
     file: UploadFile = File(...),
+    wait: bool = False,
+    result_format: str = "xlsx",
     current_user: dict = Depends(get_current_user),
     _: str = Depends(verify_csrf)
 ):
     # Only allow Admins
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Only college admins can bulk register alumni.")
-    SaaS_Management = client["SaaS_Management"]
     college_id = current_user["collegeId"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    college = await tenant_registry.get(college_id)
     if not college or college.get("status") != "approved":
         raise HTTPException(status_code=403, detail="College account is not approved yet")
-    college_db = current_user["collegeDb"]
-    
-    # Read the uploaded Excel file into a pandas DataFrame
-    contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents))
-
-    # Normalize column names
-    df.columns = [col.strip().lower() for col in df.columns]
-
-    # Check for required columns
-    if not {'name', 'prn', 'email'}.issubset(df.columns):
-        raise HTTPException(status_code=400, detail="Excel must have 'name', 'prn', and 'email' columns.")
-
-    # Prepare results for Excel output
-    passwords = []
-    statuses = []
-
-    for idx, row in df.iterrows():
-        name = str(row['name']).strip()
-        prn = str(row['prn']).strip()
-        email = str(row['email']).strip().lower()
-        password = str(random.randint(100000, 999999))
-
-        # Check if alumni already exists
-        existing = await college_db["Alumni"].find_one({"email": email})
-        if existing:
-            passwords.append("")
-            statuses.append("Already Exists")
-            continue
+    return await start_bulk_import(file, current_user, "Alumni", wait, result_format, "alumni_with_passwords")
 
-        # Prepare alumni dict
-        alumni_obj = AlumniSchema(
-            name=name,
-            email=email,
-            role="Alumni",
-            collegeId=college_id,
-            prn=prn,
-            status="offline",
-            lastSeen=None,
-            createdAt=get_current_time()
-        )
-        alumni_dict = alumni_obj.dict()
-        alumni_dict["password"] = get_password_hash(password)
-        await college_db["Alumni"].insert_one(alumni_dict)
-        passwords.append(password)
-        statuses.append("Created")
-        created_count += 1
-
-    # Add password and status columns to DataFrame
-    df['password'] = passwords
-    df['status'] = statuses
-
-    if created_count > 0:
-        await update_college_meta(college_db, "student", created_count)
-
-    # Write the DataFrame to an Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-
-    # Return the file as a response
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=alumni_with_passwords.xlsx"}
+async def get_job_for_user(job_id: str, current_user: dict) -> dict:
+    job = await job_runner.store.get(job_id)
+    if not job or job.get("collegeId") != current_user["collegeId"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only college admins can view jobs.")
+    job = await get_job_for_user(job_id, current_user)
+    job.pop("result_path", None)
+    if job["status"] == "completed":
+        job["result_url"] = f"/jobs/{job_id}/result"
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only college admins can download job results.")
+    job = await get_job_for_user(job_id, current_user)
+    if job["status"] != "completed" or not job.get("result_path") or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=409, detail=f"Job result is not available (status: {job['status']})")
+    return FileResponse(
+        job["result_path"],
+        media_type=RESULT_MEDIA_TYPES[job.get("resultFormat", "xlsx")],
+        filename=job["resultName"]
     )
 
 from fastapi import UploadFile, File, Form
@@ -1651,20 +4521,95 @@ async def create_achievement(
     return {"status": "success", "achievement": achievement_doc}
 
 @app.get("/college-stats")
-async def get_college_stats(current_user: dict = Depends(get_current_user), _: str = Depends(verify_csrf)):
-    """Get statistics for the college dashboard"""
+async def get_college_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day",
+    metrics: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    _: str = Depends(verify_csrf)
+):
+    """
+    Get statistics for the college dashboard.
+    With start and/or end, also returns rollup series and range totals
+    (e.g. ?start=2025-01-01&granularity=week&metrics=students,alumni).
+    """
     college_db = current_user["collegeDb"]
     
-    # Get meta data
+    # Get meta data; counters written by $inc upserts may lack fields that haven't moved yet
     meta = await college_db["meta"].find_one({})
     if not meta:
         meta = await initialize_college_meta(college_db)
+    meta = {**CollegeMeta().dict(), **meta}
+    meta.update(await college_meta_growth(college_db))
     
     # Convert ObjectId to string
     meta["_id"] = str(meta["_id"])
+
+    if start or end:
+        meta["rollups"] = await college_rollups(college_db, start, end, granularity, metrics)
     
     return meta
 
+async def college_rollups(college_db, start: Optional[datetime], end: Optional[datetime], granularity: str, metrics: Optional[str]) -> dict:
+    if granularity not in ("hour", "day", "week", "month"):
+        raise HTTPException(status_code=400, detail="granularity must be one of hour, day, week, month")
+    selected = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else list(ROLLUP_METRICS)
+    unknown = [m for m in selected if m not in ROLLUP_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {unknown}")
+    if "active_users" in selected and granularity in ("hour", "week"):
+        raise HTTPException(status_code=400, detail="active_users is only tracked per day and per month")
+
+    # Query parameters may carry a UTC offset; buckets are naive IST like every other timestamp
+    end = end.astimezone(IST).replace(tzinfo=None) if end and end.tzinfo else end
+    start = start.astimezone(IST).replace(tzinfo=None) if start and start.tzinfo else start
+    end = end or get_current_time()
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    bucket_seconds = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": 28 * 86400}[granularity]
+    if (end - start).total_seconds() / bucket_seconds > ROLLUP_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail="Range too large for this granularity")
+
+    series = await asyncio.gather(*(rollup_series(college_db, m, granularity, start, end) for m in selected))
+    # Distinct-user counts don't add up across buckets, so active_users has no range total.
+    # Totals cover exactly the buckets the series returns, so they equal the series' sum
+    source = "day" if granularity == "week" else granularity
+    span_start, span_end = bucket_start(start, source), bucket_end(end, source)
+    summable = [m for m in selected if m != "active_users"]
+    totals = await asyncio.gather(*(rollup_total(college_db, m, span_start, span_end) for m in summable))
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "series": dict(zip(selected, series)),
+        "totals": dict(zip(summable, totals)),
+    }
+
+@app.get("/system/metrics")
+async def get_system_metrics(current_user: dict = Depends(get_current_user)):
+    """Cache and worker statistics for this process"""
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only admins can view system metrics")
+    return {
+        "tenant_registry": tenant_registry.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "rollups": rollup_recorder.stats(),
+        "indexes": index_reconciler.stats(),
+        "group_members": group_members_cache.stats(),
+        "websockets": manager.stats(),
+        "message_bus": message_bus.stats(),
+        "message_store": message_store.stats(),
+        "conversations": conversation_store.stats(),
+        "read_receipts": read_receipts.stats(),
+        "presence": presence.stats(),
+        "recommendations": skill_recommender.stats(),
+    }
+
+ALUMNI_LIST = TypeAdapter(List[AlumniSchema])
+
 @app.get("/alumni/", response_model=List[AlumniSchema])
 async def get_all_alumni(current_user: User = Depends(get_current_user)):
     """
@@ -1675,11 +4620,407 @@ async def get_all_alumni(current_user: User = Depends(get_current_user)):
     if (current_user["role"] != "Admin"):
          raise HTTPException(status_code=403, detail="Only college admins can get alumni data.")
     college_db = current_user["collegeDb"]
-    alumni = []
     projection = {"_id": 1, "name": 1, "email": 1, "department": 1, "status": 1, "prn": 1, "gradYear": 1, "currentRole": 1, "lastSeen": 1}
-    async for alum in college_db.Alumni.find({}, projection):
-        alumni.append(AlumniSchema(**alum))
-    return alumni
+    alumni = await college_db.Alumni.find({}, projection).to_list(length=None)
+    # Validate and encode the whole list in pydantic-core rather than model by model
+    return Response(ALUMNI_LIST.dump_json(ALUMNI_LIST.validate_python(alumni)), media_type="application/json")
+
+# Alumni directory
+# Without a query the directory is browsed by (name, _id); with one, Mongo's
+# text index ranks matches and pages go by (score, _id). Facet counts are only
+# computed for the first page and each facet ignores its own filter, so the
+# client can show the alternatives to the value it has selected. Browsing only
+# lists alumni with a string name: nulls sort first and can't be paged past with
+# $gt. Email addresses are only returned to admins (recommendations reuse the
+# projection and never include them).
+DIRECTORY_PAGE_MAX = int(os.getenv("DIRECTORY_PAGE_MAX", "100"))
+DIRECTORY_FACETS = ("gradYear", "department", "mentorshipStatus")
+DIRECTORY_PROJECTION = {
+    "name": 1, "department": 1, "gradYear": 1, "degree": 1, "currentRole": 1,
+    "mentorshipStatus": 1, "skills": 1, "location": 1, "status": 1, "lastSeen": 1,
+    "professionalExperience.company": 1, "professionalExperience.title": 1,
+}
+
+def encode_position(value, document_id) -> str:
+    raw = orjson.dumps([value, str(document_id)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_position(cursor: str):
+    try:
+        value, document_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return value, ObjectId(document_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def directory_facets(college_db, text: dict, filters: dict) -> dict:
+    pipelines = {}
+    for facet in DIRECTORY_FACETS:
+        others = {field: value for field, value in filters.items() if field != facet}
+        pipelines[facet] = [{"$match": others}, {"$sortByCount": f"${facet}"}, {"$limit": 50}]
+    result = await college_db.Alumni.aggregate([{"$match": text}, {"$facet": pipelines}]).to_list(length=1)
+    return {
+        facet: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in buckets if bucket["_id"] is not None]
+        for facet, buckets in result[0].items()
+    }
+
+@app.get("/directory/search")
+async def search_directory(
+    q: Optional[str] = None,
+    gradYear: Optional[int] = None,
+    department: Optional[str] = None,
+    mentorshipStatus: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 20,
+    facets: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """Search the college's alumni by name, skills, department, role or company."""
+    college_db = current_user["collegeDb"]
+    limit = max(1, min(limit, DIRECTORY_PAGE_MAX))
+    filters = {
+        field: value
+        for field, value in (("gradYear", gradYear), ("department", department), ("mentorshipStatus", mentorshipStatus))
+        if value is not None
+    }
+    text = {"$text": {"$search": q}} if q and q.strip() else {}
+    position = decode_position(after) if after else None
+    projection = {**DIRECTORY_PROJECTION, "email": 1} if current_user["role"] == "Admin" else DIRECTORY_PROJECTION
+
+    if text:
+        pipeline = [{"$match": {**text, **filters}}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+        if position:
+            score, document_id = position
+            pipeline.append({"$match": {"$or": [{"score": {"$lt": score}}, {"score": score, "_id": {"$gt": document_id}}]}})
+        pipeline += [
+            {"$sort": {"score": -1, "_id": 1}},
+            {"$limit": limit + 1},
+            {"$project": {**projection, "score": 1}},
+        ]
+        results = college_db.Alumni.aggregate(pipeline).to_list(length=limit + 1)
+        sort_key = "score"
+    else:
+        query = {**filters, "name": {"$type": "string"}}
+        if position:
+            name, document_id = position
+            query["$or"] = [{"name": {"$gt": name}}, {"name": name, "_id": {"$gt": document_id}}]
+        results = college_db.Alumni.find(query, projection).sort([("name", ASCENDING), ("_id", ASCENDING)]).limit(limit + 1).to_list(length=limit + 1)
+        sort_key = "name"
+
+    if facets and not after:
+        page, facet_counts = await asyncio.gather(results, directory_facets(college_db, text, filters))
+    else:
+        page, facet_counts = await results, None
+
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_position(page[-1].get(sort_key), page[-1]["_id"])
+    return FastJSONResponse({"results": page, "facets": facet_counts}, headers=headers)
+
+# Alumni recommendations
+# Each college gets an alumni x feature matrix, with features being normalised
+# skills plus department and degree at lower weights. Without scipy the sparse
+# matrix is kept as one posting array pair (rows, weights) per feature, so a
+# profile write only rewrites the postings of the features it touches. A query
+# scores every alumnus at once by adding the TF-IDF weighted postings of the
+# asker's features into one score vector, divides by the cached row norms and
+# takes the top k with argpartition. Results are cached per user and tagged
+# with the index version, which every write bumps. Profile writes are published
+# on the message bus so every worker's index applies them; writes that land
+# while an index is being built are replayed onto it before it is swapped in.
+# Indexes are rebuilt in the background after RECOMMEND_INDEX_TTL_SECONDS to
+# pick up anything no event covered (bulk imports, direct database edits).
+RECOMMEND_FEATURE_WEIGHTS = {"skill": 1.0, "department": 0.5, "degree": 0.3}
+RECOMMEND_PROJECTION = {"skills": 1, "department": 1, "degree": 1}
+RECOMMEND_CACHE_MAX = int(os.getenv("RECOMMEND_CACHE_MAX", "10000"))
+RECOMMEND_LIMIT_MAX = int(os.getenv("RECOMMEND_LIMIT_MAX", "50"))
+RECOMMEND_INDEX_TTL_SECONDS = float(os.getenv("RECOMMEND_INDEX_TTL_SECONDS", "3600"))
+
+def profile_features(profile: dict) -> dict:
+    """Weighted feature terms of a profile, e.g. {"skill:python": 1.0, "department:it": 0.5}."""
+    features = {}
+    for skill in profile.get("skills") or []:
+        if isinstance(skill, str) and skill.strip():
+            features[f"skill:{skill.strip().lower()}"] = RECOMMEND_FEATURE_WEIGHTS["skill"]
+    for field in ("department", "degree"):
+        value = profile.get(field)
+        if isinstance(value, str) and value.strip():
+            features[f"{field}:{value.strip().lower()}"] = RECOMMEND_FEATURE_WEIGHTS[field]
+    return features
+
+class SkillIndex:
+    """TF-IDF weighted alumni x feature matrix for one college."""
+
+    def __init__(self):
+        self.rows: dict = {}          # alumni id -> row
+        self.ids: list = []           # row -> alumni id, None for a free row
+        self.free: list = []
+        self.row_features: list = []  # row -> {feature: weight}
+        self.postings: dict = {}      # feature -> (rows int32 array, weights float32 array)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self._norms_stale = False
+        self.version = 0
+
+    def _idf(self, document_frequency: int) -> float:
+        return float(np.log((1 + len(self.rows)) / (1 + document_frequency)) + 1.0)
+
+    def _add(self, feature: str, row: int, weight: float):
+        posting = self.postings.get(feature)
+        if posting is None:
+            self.postings[feature] = (np.array([row], dtype=np.int32), np.array([weight], dtype=np.float32))
+        else:
+            self.postings[feature] = (np.append(posting[0], np.int32(row)), np.append(posting[1], np.float32(weight)))
+
+    def _drop(self, feature: str, row: int):
+        rows, weights = self.postings[feature]
+        keep = rows != row
+        if keep.any():
+            self.postings[feature] = (rows[keep], weights[keep])
+        else:
+            del self.postings[feature]
+
+    def load(self, profiles):
+        """Bulk-build an empty index from (alumni id, profile) pairs, creating each posting array once."""
+        postings = {}
+        for user_id, profile in profiles:
+            features = profile_features(profile)
+            if not features:
+                continue
+            row = len(self.ids)
+            self.ids.append(user_id)
+            self.row_features.append(features)
+            self.rows[user_id] = row
+            for feature, weight in features.items():
+                rows, weights = postings.setdefault(feature, ([], []))
+                rows.append(row)
+                weights.append(weight)
+        self.postings = {
+            feature: (np.array(rows, dtype=np.int32), np.array(weights, dtype=np.float32))
+            for feature, (rows, weights) in postings.items()
+        }
+        self._norms_stale = True
+        self.version += 1
+
+    def upsert(self, user_id: str, profile: dict):
+        features = profile_features(profile)
+        row = self.rows.get(user_id)
+        self.version += 1
+        if not features:
+            # A profile with no features can never match anything
+            if row is not None:
+                self.remove(user_id)
+            return
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+                self.ids[row] = user_id
+            else:
+                row = len(self.ids)
+                self.ids.append(user_id)
+                self.row_features.append({})
+            self.rows[user_id] = row
+        old = self.row_features[row]
+        for feature in old.keys() - features.keys():
+            self._drop(feature, row)
+        for feature in features.keys() - old.keys():
+            self._add(feature, row, features[feature])
+        self.row_features[row] = features
+        self._norms_stale = True
+
+    def remove(self, user_id: str):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        for feature in self.row_features[row]:
+            self._drop(feature, row)
+        self.row_features[row] = {}
+        self.ids[row] = None
+        self.free.append(row)
+        self._norms_stale = True
+        self.version += 1
+
+    def _refresh_norms(self):
+        # IDF moves with every write, so norms are recomputed lazily, one vectorised pass per feature
+        squares = np.zeros(len(self.ids), dtype=np.float32)
+        for rows, weights in self.postings.values():
+            squares[rows] += (weights * self._idf(len(rows))) ** 2
+        self.norms = np.sqrt(squares)
+        self._norms_stale = False
+
+    def query(self, features: dict, exclude: Optional[str] = None, k: int = 10) -> list:
+        """Top k (alumni id, cosine similarity) for a feature dict."""
+        if not features or not self.rows:
+            return []
+        if self._norms_stale or len(self.norms) != len(self.ids):
+            self._refresh_norms()
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        query_norm = 0.0
+        for feature, weight in features.items():
+            posting = self.postings.get(feature)
+            idf = self._idf(len(posting[0]) if posting else 0)
+            query_weight = weight * idf
+            query_norm += query_weight ** 2
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights * (idf * query_weight)
+        excluded = self.rows.get(exclude)
+        if excluded is not None:
+            scores[excluded] = 0
+        scores = np.divide(scores, self.norms * np.sqrt(query_norm), out=np.zeros_like(scores), where=self.norms > 0)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top]
+
+    def shared_skills(self, features: dict, user_id: str) -> List[str]:
+        row_features = self.row_features[self.rows[user_id]]
+        return [feature[len("skill:"):] for feature in features if feature.startswith("skill:") and feature in row_features]
+
+class SkillRecommender:
+    def __init__(self, cache_max: int = RECOMMEND_CACHE_MAX, ttl_seconds: float = RECOMMEND_INDEX_TTL_SECONDS):
+        self.cache_max = cache_max
+        self.ttl = ttl_seconds
+        self._indexes: dict = {}  # collegeId -> SkillIndex
+        self._built_at: dict = {}  # collegeId -> monotonic time the index was swapped in
+        self._pending: dict = {}
+        self._building: dict = {}  # collegeId -> writes to replay onto the index being built
+        self._refreshing: dict = {}  # collegeId -> background rebuild task
+        self._cache: OrderedDict = OrderedDict()  # (collegeId, userId) -> (index version, limit, results)
+        self.builds = 0
+        self.replayed = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def index(self, college_id: str, college_db) -> SkillIndex:
+        index = self._indexes.get(college_id)
+        if index is None:
+            return await _single_flight(self._pending, college_id, lambda: self._build(college_id, college_db))
+        if time.monotonic() - self._built_at[college_id] > self.ttl:
+            # Keep serving the current index while a fresh one is built
+            task = self._refreshing.get(college_id)
+            if task is None or task.done():
+                self._refreshing[college_id] = asyncio.create_task(self._refresh(college_id, college_db))
+        return index
+
+    async def _refresh(self, college_id: str, college_db):
+        try:
+            await _single_flight(self._pending, college_id, lambda: self._build(college_id, college_db))
+        except Exception as e:
+            print(f"Error rebuilding recommendations for {college_id}: {e}")
+
+    async def _build(self, college_id: str, college_db) -> SkillIndex:
+        index = SkillIndex()
+        # Writes from here on are queued for the new index as well as applied to any current one
+        self._building[college_id] = writes = []
+        try:
+            alumni = await college_db.Alumni.find({}, RECOMMEND_PROJECTION).to_list(length=None)
+            # The index isn't visible until built, so the CPU-bound part can leave the event loop
+            await asyncio.to_thread(index.load, [(str(alum["_id"]), alum) for alum in alumni])
+        finally:
+            del self._building[college_id]
+        # No await from here to the swap, so no write can slip in between
+        for op, user_ids, profile in writes:
+            self._apply_to(index, op, user_ids, profile)
+        self.replayed += len(writes)
+        previous = self._indexes.get(college_id)
+        if previous is not None:
+            # Results cached against the previous index must not match the new one
+            index.version = max(index.version, previous.version + 1)
+        self._indexes[college_id] = index
+        self._built_at[college_id] = time.monotonic()
+        self.builds += 1
+        return index
+
+    @staticmethod
+    def _apply_to(index: SkillIndex, op: str, user_ids: list, profile: Optional[dict]):
+        for user_id in user_ids:
+            if op == "upsert":
+                index.upsert(user_id, profile)
+            elif op == "remove":
+                index.remove(user_id)
+
+    def _apply(self, college_id: str, op: str, user_ids: list, profile: Optional[dict] = None):
+        writes = self._building.get(college_id)
+        if writes is not None:
+            writes.append((op, user_ids, profile))
+        index = self._indexes.get(college_id)
+        if index is not None:
+            self._apply_to(index, op, user_ids, profile)
+        for user_id in user_ids:
+            self._cache.pop((college_id, user_id), None)
+
+    async def _publish(self, college_id: str, op: str, user_ids: list, profile: Optional[dict] = None):
+        self._apply(college_id, op, user_ids, profile)
+        await message_bus.publish({"kind": "recommend", "college": college_id, "op": op, "users": user_ids, "profile": profile})
+
+    def handle_event(self, event: dict):
+        """Apply a profile write published by another worker."""
+        self._apply(event["college"], event["op"], event["users"], event.get("profile"))
+
+    async def update_profile(self, college_id: str, user_id, profile: dict):
+        """Apply an alumni profile write; colleges without a loaded index pick it up when built."""
+        fields = {field: profile.get(field) for field in RECOMMEND_PROJECTION}
+        await self._publish(college_id, "upsert", [str(user_id)], fields)
+
+    async def remove(self, college_id: str, user_ids):
+        await self._publish(college_id, "remove", [str(user_id) for user_id in user_ids])
+
+    async def invalidate_user(self, college_id: str, user_id):
+        """Drop a non-alumni user's cached results after their own profile changed."""
+        await self._publish(college_id, "invalidate", [str(user_id)])
+
+    async def recommend(self, college_id: str, college_db, user: dict, limit: int) -> list:
+        index = await self.index(college_id, college_db)
+        key = (college_id, str(user["_id"]))
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == index.version and cached[1] >= limit:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[2][:limit]
+        self.misses += 1
+
+        features = profile_features(user)
+        ranked = index.query(features, exclude=str(user["_id"]), k=limit)
+        profiles = {}
+        if ranked:
+            ids = [ObjectId(user_id) for user_id, _ in ranked]
+            async for alum in college_db.Alumni.find({"_id": {"$in": ids}}, DIRECTORY_PROJECTION):
+                profiles[str(alum["_id"])] = alum
+        results = [
+            {**profiles[user_id], "score": round(score, 4), "sharedSkills": index.shared_skills(features, user_id)}
+            for user_id, score in ranked
+            if user_id in profiles
+        ]
+        self._cache[key] = (index.version, limit, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max:
+            self._cache.popitem(last=False)
+        return results
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "colleges": len(self._indexes),
+            "alumni": sum(len(index.rows) for index in self._indexes.values()),
+            "features": sum(len(index.postings) for index in self._indexes.values()),
+            "builds": self.builds,
+            "replayed": self.replayed,
+            "cached_users": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+skill_recommender = SkillRecommender()
+
+@app.get("/recommendations/alumni")
+async def recommend_alumni(limit: int = 10, current_user: dict = Depends(get_current_user)):
+    """Alumni whose skills, department and degree are most similar to the current user's."""
+    limit = max(1, min(limit, RECOMMEND_LIMIT_MAX))
+    results = await skill_recommender.recommend(current_user["collegeId"], current_user["collegeDb"], current_user, limit)
+    return FastJSONResponse(results)
 
 @app.post("/add-student/")
 async def add_student(
@@ -1708,7 +5049,7 @@ async def add_student(
     student_dict["collegeId"] = college_id
     student_dict["status"] = "offline"
     student_dict["createdAt"] = get_current_time()
-    student_dict["password"] = get_password_hash(password)
+    student_dict["password"] = await get_password_hash_async(password)
     
     result = await college_db["Student"].insert_one(student_dict)
     
@@ -1752,9 +5093,10 @@ async def add_alumni(
     alumni_dict["collegeId"] = college_id
     alumni_dict["status"] = "offline"
     alumni_dict["createdAt"] = get_current_time()
-    alumni_dict["password"] = get_password_hash(password)
+    alumni_dict["password"] = await get_password_hash_async(password)
     
     result = await college_db["Alumni"].insert_one(alumni_dict)
+    await skill_recommender.update_profile(college_id, result.inserted_id, alumni_dict)
     
     # Update meta collection
     await update_college_meta(college_db, "alumni", 1)
@@ -1769,3 +5111,42 @@ async def add_alumni(
         "alumni": alumni_dict
     }
 
+
+# Maintenance commands, e.g. `python app.py recompute-meta COEP`
+async def recompute_meta_command(college_ids: List[str]):
+    query = {"status": "approved"}
+    if college_ids:
+        query["collegeId"] = {"$in": college_ids}
+    async for college in client["SaaS_Management"].colleges.find(query):
+        totals = await recompute_college_meta(client[college["databaseName"]])
+        print(f"Recomputed meta for {college['collegeId']}: {totals}")
+
+async def rebuild_conversations_command(college_ids: List[str]):
+    query = {"status": "approved"}
+    if college_ids:
+        query["collegeId"] = {"$in": college_ids}
+    async for college in client["SaaS_Management"].colleges.find(query):
+        written = await conversation_store.rebuild(client[college["databaseName"]])
+        print(f"Rebuilt {written} conversation summaries for {college['collegeId']}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AlumniConnect maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    recompute_parser = commands.add_parser("recompute-meta", help="Rebuild college meta counters from source collections")
+    recompute_parser.add_argument("college_ids", nargs="*", help="College ids to repair (default: all approved colleges)")
+    index_parser = commands.add_parser("reconcile-indexes", help="Create catalogue indexes missing from tenant databases")
+    index_parser.add_argument("college_ids", nargs="*", help="College ids to reconcile (default: all approved colleges)")
+    index_parser.add_argument("--dry-run", action="store_true", help="Only report missing indexes")
+    conversations_parser = commands.add_parser("rebuild-conversations", help="Rebuild inbox summaries from message history")
+    conversations_parser.add_argument("college_ids", nargs="*", help="College ids to rebuild (default: all approved colleges)")
+    args = parser.parse_args()
+
+    if args.command == "recompute-meta":
+        asyncio.run(recompute_meta_command(args.college_ids))
+    elif args.command == "reconcile-indexes":
+        missing = asyncio.run(IndexReconciler().reconcile_all(create=not args.dry_run, college_ids=args.college_ids))
+        print(json.dumps(missing, indent=2))
+    elif args.command == "rebuild-conversations":
+        asyncio.run(rebuild_conversations_command(args.college_ids))
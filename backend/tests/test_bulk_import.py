@@ -0,0 +1,78 @@
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BULK_CHUNK_SIZE", "3")
+os.environ.setdefault("JOBS_DIR", tempfile.mkdtemp(prefix="jobs-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.datastructures import UploadFile
+
+import app
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        emails = set(query["email"]["$in"])
+        return FakeCursor([{"email": doc["email"]} for doc in self.docs if doc["email"] in emails])
+
+    async def insert_many(self, documents, ordered=True):
+        self.docs.extend(documents)
+
+    async def update_one(self, query, update, upsert=False):
+        pass
+
+
+class FakeDatabase:
+    name = "college_test"
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+def test_wait_csv_import_streams_every_chunk_after_upload_is_closed():
+    rows = [(f"r{i}", f"student{i}@example.com" if i % 3 == 0 else "not-an-email") for i in range(8)]
+    body = io.StringIO()
+    csv.writer(body).writerows([("rollno", "email"), *rows])
+    college_db = FakeDatabase()
+    user = {"_id": "admin", "collegeDb": college_db, "collegeId": "c1"}
+
+    async def run():
+        upload = UploadFile(file=io.BytesIO(body.getvalue().encode()), filename="students.csv")
+        response = await app.start_bulk_import(upload, user, "Student", True, "csv", "students")
+        # The request's upload is closed once the handler returns, before the body is sent
+        await upload.close()
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    result = asyncio.run(run())
+
+    lines = list(csv.reader(io.StringIO(result.decode())))
+    assert lines[0] == ["rollno", "email", "password", "status"]
+    assert [line[0] for line in lines[1:]] == [rollno for rollno, _ in rows]
+    assert sum(line[3] == "Created" for line in lines[1:]) == 3
+    assert len(college_db["Student"].docs) == 3
+    assert os.listdir(os.path.join(app.JOBS_DIR, "uploads")) == []
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def sort(self, key, direction):
+        self._docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeRollups:
+    def __init__(self, events):
+        self.docs = {}
+        for moment in events:
+            for granularity in app.ROLLUP_GRANULARITIES:
+                start = app.bucket_start(moment, granularity)
+                key = app.rollup_id("messages", granularity, start)
+                doc = self.docs.setdefault(key, {
+                    "_id": key, "metric": "messages", "granularity": granularity, "start": start, "value": 0
+                })
+                doc["value"] += 1
+
+    def find(self, query, projection=None):
+        if "_id" in query:
+            ids = set(query["_id"]["$in"])
+            return FakeCursor(doc for key, doc in self.docs.items() if key in ids)
+        return FakeCursor(
+            doc for doc in self.docs.values()
+            if doc["metric"] == query["metric"] and doc["granularity"] == query["granularity"]
+            and query["start"]["$gte"] <= doc["start"] < query["start"]["$lt"]
+        )
+
+
+class FakeDatabase:
+    def __init__(self, events):
+        self.rollups = FakeRollups(events)
+
+    def __getitem__(self, name):
+        return self.rollups
+
+
+def test_rollup_totals_equal_the_sum_of_the_series():
+    origin = datetime(2025, 1, 30, 22, 0)
+    db = FakeDatabase([origin + timedelta(minutes=37 * i) for i in range(200)])
+    ranges = [
+        (datetime(2025, 1, 31, 9, 10), datetime(2025, 1, 31, 9, 40)),
+        (datetime(2025, 1, 30, 23, 15), datetime(2025, 2, 2, 14, 20)),
+        (datetime(2025, 1, 29, 5, 0), datetime(2025, 2, 4, 0, 0)),
+    ]
+
+    for start, end in ranges:
+        for granularity in ("hour", "day", "week", "month"):
+            result = asyncio.run(app.college_rollups(db, start, end, granularity, "messages"))
+            series = result["series"]["messages"]
+            assert series, (start, end, granularity)
+            assert result["totals"]["messages"] == sum(point["value"] for point in series), (start, end, granularity)
+
+
+def test_cover_range_keeps_the_partial_last_hour():
+    start, end = datetime(2025, 1, 31, 9, 10), datetime(2025, 1, 31, 9, 40)
+    assert app.cover_range(start, end) == [("hour", datetime(2025, 1, 31, 9, 0))]
+    assert app.cover_range(start, datetime(2025, 1, 31, 10, 0)) == [("hour", datetime(2025, 1, 31, 9, 0))]